@@ -0,0 +1,84 @@
+"""
+Conditional GET Support
+ETag / Last-Modified validators derived from the profile version counter
+"""
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Profile
+
+
+def bump_profile_version(db: Session, profile_id: int):
+    """
+    Mark the profile as changed: increments its version and updated_at
+
+    Call before committing any write to the profile or its related records,
+    so the change and the new version are committed together
+    """
+    db.query(Profile).filter(Profile.id == profile_id).update(
+        {Profile.version: Profile.version + 1, Profile.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+
+
+def make_etag(profile_id: int, created_at: Optional[datetime], version: int) -> str:
+    """
+    Strong ETag for every representation of the profile at this version
+
+    created_at is included so a deleted and re-created profile never reuses an ETag
+    """
+    created = int(created_at.timestamp()) if created_at else 0
+    return f'"{profile_id}-{created}-{version}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.replace(microsecond=0) <= since.replace(tzinfo=None)
+
+
+def conditional_get(request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Dependency for read endpoints: answers 304 Not Modified when the client's
+    validators are current, otherwise sets ETag and Last-Modified on the response
+
+    Costs one query on the profiles table; the relationship tables are only
+    read when a full response is needed
+    """
+    state = db.query(Profile.id, Profile.created_at, Profile.updated_at, Profile.version).first()
+    if state is None:
+        return  # The endpoint itself answers 404
+
+    etag = make_etag(state.id, state.created_at, state.version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if state.updated_at:
+        # updated_at is stored as naive UTC
+        headers["Last-Modified"] = state.updated_at.strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        # If-Modified-Since only counts when no ETag was sent (RFC 9110)
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since and state.updated_at) and \
+            _not_modified_since(if_modified_since, state.updated_at)
+
+    if not_modified:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
@@ -2,9 +2,12 @@
 Database Configuration and Session Management
 Handles SQLAlchemy engine, session creation, and connection pooling
 """
-from sqlalchemy import create_engine,text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Generator, Optional
+from contextvars import ContextVar
+from contextlib import contextmanager
+import threading
 import os
 from dotenv import load_dotenv
 
@@ -34,6 +37,77 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+# ===== Query Counting =====
+# Statements executed while a counter is active (one per request, see main.py)
+_query_counter: ContextVar[Optional[list]] = ContextVar("query_counter", default=None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements executed inside the block
+    
+    Usage:
+        with count_queries() as counter:
+            ...
+        print(counter[0])
+    """
+    counter = [0]
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+class QueryStats:
+    """
+    Per-endpoint SQL statement counts (requests, last, min, max, mean)
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+    
+    def record(self, endpoint: str, queries: int):
+        with self._lock:
+            stats = self._endpoints.setdefault(
+                endpoint, {"requests": 0, "total": 0, "last": 0, "min": queries, "max": 0}
+            )
+            stats["requests"] += 1
+            stats["total"] += queries
+            stats["last"] = queries
+            stats["min"] = min(stats["min"], queries)
+            stats["max"] = max(stats["max"], queries)
+    
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {
+                    "requests": stats["requests"],
+                    "last": stats["last"],
+                    "min": stats["min"],
+                    "max": stats["max"],
+                    "mean": round(stats["total"] / stats["requests"], 2),
+                }
+                for endpoint, stats in sorted(self._endpoints.items())
+            }
+    
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+QUERY_STATS = QueryStats()
+
+
 def get_db() -> Generator[Session, None, None]:
     """
     Dependency function for FastAPI routes
@@ -51,14 +125,38 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+# Tables created by Alembic revisions (migrations/versions) rather than create_all
+MIGRATION_TABLES = {"profile_snapshots"}
+
+
 def init_db():
     """
     Initialize database tables
     Should be called on application startup
     """
     from models import Base
-    Base.metadata.create_all(bind=engine)
+    tables = [table for table in Base.metadata.sorted_tables if table.name not in MIGRATION_TABLES]
+    Base.metadata.create_all(bind=engine, tables=tables)
     print("✅ Database tables created successfully")
+    run_migrations()
+
+
+def run_migrations():
+    """
+    Apply pending Alembic migrations (schema changes after the initial tables,
+    full-text search indexes)
+    Equivalent to running `alembic upgrade head` in the backend directory
+    
+    Raises if a migration fails: the app must not run on a partial schema
+    """
+    from alembic import command
+    from alembic.config import Config as AlembicConfig
+    
+    config = AlembicConfig(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+    print("✅ Database migrations applied")
 
 
 def check_db_connection() -> bool:
@@ -0,0 +1,50 @@
+"""
+Relationship Loader Strategies
+Eager-loading options for read endpoints, so responses are built without lazy loads
+"""
+from sqlalchemy.orm import Query, Session, selectinload
+
+from models import Profile, Project
+
+
+# selectinload issues one extra SELECT ... WHERE id IN (...) per relationship,
+# so the number of queries is fixed no matter how many rows each collection has.
+# joinedload is avoided for collections: joining five one-to-many tables multiplies rows.
+
+def project_options() -> list:
+    """Loader options for a project and its skills"""
+    return [selectinload(Project.skills)]
+
+
+def profile_options() -> list:
+    """
+    Loader options for the complete profile
+
+    Loads every collection ProfileResponse serializes, including the skills of
+    each project, in 7 queries in total (profile + 5 collections + project skills)
+    """
+    return [
+        selectinload(Profile.education),
+        selectinload(Profile.work_experience),
+        selectinload(Profile.projects).selectinload(Project.skills),
+        selectinload(Profile.skills),
+        selectinload(Profile.social_links),
+    ]
+
+
+def profile_query(db: Session, *relationships) -> Query:
+    """
+    Query for the profile with the given relationships eager-loaded
+
+    Args:
+        db: Database session
+        relationships: Profile relationship attributes (e.g. Profile.education);
+            with none given, the complete profile is loaded
+    """
+    options = [selectinload(rel) for rel in relationships] if relationships else profile_options()
+    return db.query(Profile).options(*options)
+
+
+def project_query(db: Session) -> Query:
+    """Query for projects with their skills eager-loaded"""
+    return db.query(Project).options(*project_options())
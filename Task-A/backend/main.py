@@ -2,15 +2,19 @@
 Me-API Playground - FastAPI Backend
 Main application file with all API endpoints
 """
-from fastapi import FastAPI, Depends, HTTPException, Query, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, desc
+from sqlalchemy import func, desc
 from typing import List, Optional
 from datetime import datetime
 import os
 
-from database import get_db, init_db, check_db_connection
+from database import get_db, init_db, check_db_connection, count_queries, QUERY_STATS
+from loaders import profile_query, project_query
+from conditional import conditional_get
+from profile_snapshot import commit_profile_change, read_profile_snapshot
+from search import search
 from models import Profile, Education, WorkExperience, Project, Skill, SocialLink
 from schemas import (
     ProfileResponse, ProfileCreate, ProfileUpdate,
@@ -44,9 +48,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Query-Count", "ETag", "Last-Modified"],
 )
 
 
+# ===== Query Count Middleware =====
+@app.middleware("http")
+async def query_count_middleware(request: Request, call_next):
+    """Count SQL statements per request and record them per endpoint"""
+    with count_queries() as counter:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    endpoint = f"{request.method} {route.path if route else request.url.path}"
+    QUERY_STATS.record(endpoint, counter[0])
+    response.headers["X-Query-Count"] = str(counter[0])
+    return response
+
+
 # ===== Startup Event =====
 @app.on_event("startup")
 async def startup_event():
@@ -77,8 +95,8 @@ def health_check():
 
 # ===== Profile CRUD Endpoints =====
 
-@app.get("/profile", response_model=ProfileResponse, tags=["Profile"])
-def read_profile(db: Session = Depends(get_db)):
+@app.get("/profile", response_model=ProfileResponse, tags=["Profile"], dependencies=[Depends(conditional_get)])
+def read_profile(response: Response, db: Session = Depends(get_db)):
     """
     Get complete profile with all related data
     
@@ -89,16 +107,20 @@ def read_profile(db: Session = Depends(get_db)):
         - Projects with associated skills
         - Skills
         - Social links
+    
+    Served from the materialized snapshot (see profile_snapshot.py): one query,
+    whatever the size of the profile
     """
-    profile = db.query(Profile).first()
+    body = read_profile_snapshot(db)
     
-    if not profile:
+    if body is None:
         raise HTTPException(
             status_code=404, 
             detail="Profile not found. Create a profile first using POST /profile"
         )
     
-    return profile
+    # Validators set by conditional_get
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
 
 
 @app.post("/profile", response_model=ProfileResponse, status_code=status.HTTP_201_CREATED, tags=["Profile"])
@@ -169,10 +191,9 @@ def create_profile(
         link = SocialLink(profile_id=profile.id, **link_data.model_dump())
         db.add(link)
     
-    db.commit()
-    db.refresh(profile)
+    body = commit_profile_change(db, profile.id)
     
-    return profile
+    return Response(content=body, media_type="application/json", status_code=status.HTTP_201_CREATED)
 
 
 @app.put("/profile", response_model=ProfileResponse, tags=["Profile"])
@@ -247,10 +268,9 @@ def update_profile(
             new_link = SocialLink(profile_id=profile.id, **link.model_dump())
             db.add(new_link)
     
-    db.commit()
-    db.refresh(profile)
+    body = commit_profile_change(db, profile.id)
     
-    return profile
+    return Response(content=body, media_type="application/json")
 
 
 @app.delete("/profile", status_code=status.HTTP_204_NO_CONTENT, tags=["Profile"])
@@ -277,10 +297,10 @@ def delete_profile(
 
 # ===== Education Endpoints =====
 
-@app.get("/education", response_model=List[EducationResponse], tags=["Education"])
+@app.get("/education", response_model=List[EducationResponse], tags=["Education"], dependencies=[Depends(conditional_get)])
 def read_education(db: Session = Depends(get_db)):
     """Get all education records"""
-    profile = db.query(Profile).first()
+    profile = profile_query(db, Profile.education).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
@@ -300,7 +320,7 @@ def create_education(
     
     education = Education(profile_id=profile.id, **education_data.model_dump())
     db.add(education)
-    db.commit()
+    commit_profile_change(db, profile.id)
     db.refresh(education)
     
     return education
@@ -321,7 +341,7 @@ def update_education(
     for key, value in education_data.model_dump(exclude_unset=True).items():
         setattr(education, key, value)
     
-    db.commit()
+    commit_profile_change(db, education.profile_id)
     db.refresh(education)
     
     return education
@@ -338,18 +358,19 @@ def delete_education(
     if not education:
         raise HTTPException(status_code=404, detail="Education record not found")
     
+    profile_id = education.profile_id
     db.delete(education)
-    db.commit()
+    commit_profile_change(db, profile_id)
     
     return None
 
 
 # ===== Work Experience Endpoints =====
 
-@app.get("/work-experience", response_model=List[WorkExperienceResponse], tags=["Work Experience"])
+@app.get("/work-experience", response_model=List[WorkExperienceResponse], tags=["Work Experience"], dependencies=[Depends(conditional_get)])
 def read_work_experience(db: Session = Depends(get_db)):
     """Get all work experience records"""
-    profile = db.query(Profile).first()
+    profile = profile_query(db, Profile.work_experience).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
@@ -369,7 +390,7 @@ def create_work_experience(
     
     work = WorkExperience(profile_id=profile.id, **work_data.model_dump())
     db.add(work)
-    db.commit()
+    commit_profile_change(db, profile.id)
     db.refresh(work)
     
     return work
@@ -390,7 +411,7 @@ def update_work_experience(
     for key, value in work_data.model_dump(exclude_unset=True).items():
         setattr(work, key, value)
     
-    db.commit()
+    commit_profile_change(db, work.profile_id)
     db.refresh(work)
     
     return work
@@ -407,15 +428,16 @@ def delete_work_experience(
     if not work:
         raise HTTPException(status_code=404, detail="Work experience not found")
     
+    profile_id = work.profile_id
     db.delete(work)
-    db.commit()
+    commit_profile_change(db, profile_id)
     
     return None
 
 
 # ===== Projects Endpoints =====
 
-@app.get("/projects", response_model=List[ProjectResponse], tags=["Projects"])
+@app.get("/projects", response_model=List[ProjectResponse], tags=["Projects"], dependencies=[Depends(conditional_get)])
 def get_projects(
     skill: Optional[str] = Query(None, description="Filter projects by skill name"),
     status: Optional[str] = Query(None, description="Filter by status (completed, in-progress, archived)"),
@@ -428,7 +450,7 @@ def get_projects(
         - skill: Filter projects that use a specific skill
         - status: Filter by project status
     """
-    query = db.query(Project)
+    query = project_query(db)
     
     if skill:
         query = query.join(Project.skills).filter(
@@ -442,10 +464,10 @@ def get_projects(
     return projects
 
 
-@app.get("/projects/{project_id}", response_model=ProjectResponse, tags=["Projects"])
+@app.get("/projects/{project_id}", response_model=ProjectResponse, tags=["Projects"], dependencies=[Depends(conditional_get)])
 def read_project(project_id: int, db: Session = Depends(get_db)):
     """Get a specific project by ID"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = project_query(db).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -473,7 +495,7 @@ def create_project(
         project.skills.extend(skills)
     
     db.add(project)
-    db.commit()
+    commit_profile_change(db, profile.id)
     db.refresh(project)
     
     return project
@@ -503,7 +525,7 @@ def update_project(
             skills = db.query(Skill).filter(Skill.id.in_(skill_ids)).all()
             project.skills.extend(skills)
     
-    db.commit()
+    commit_profile_change(db, project.profile_id)
     db.refresh(project)
     
     return project
@@ -520,25 +542,26 @@ def delete_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    profile_id = project.profile_id
     db.delete(project)
-    db.commit()
+    commit_profile_change(db, profile_id)
     
     return None
 
 
 # ===== Skills Endpoints =====
 
-@app.get("/skills", response_model=List[SkillResponse], tags=["Skills"])
+@app.get("/skills", response_model=List[SkillResponse], tags=["Skills"], dependencies=[Depends(conditional_get)])
 def read_skills(db: Session = Depends(get_db)):
     """Get all skills"""
-    profile = db.query(Profile).first()
+    profile = profile_query(db, Profile.skills).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
     return profile.skills
 
 
-@app.get("/skills/top", response_model=List[SkillWithCount], tags=["Skills"])
+@app.get("/skills/top", response_model=List[SkillWithCount], tags=["Skills"], dependencies=[Depends(conditional_get)])
 def get_top_skills(
     limit: int = Query(10, ge=1, le=50, description="Number of top skills to return"),
     db: Session = Depends(get_db)
@@ -584,7 +607,7 @@ def create_skill(
     
     skill = Skill(profile_id=profile.id, **skill_data.model_dump())
     db.add(skill)
-    db.commit()
+    commit_profile_change(db, profile.id)
     db.refresh(skill)
     
     return skill
@@ -605,7 +628,7 @@ def update_skill(
     for key, value in skill_data.model_dump(exclude_unset=True).items():
         setattr(skill, key, value)
     
-    db.commit()
+    commit_profile_change(db, skill.profile_id)
     db.refresh(skill)
     
     return skill
@@ -622,18 +645,19 @@ def delete_skill(
     if not skill:
         raise HTTPException(status_code=404, detail="Skill not found")
     
+    profile_id = skill.profile_id
     db.delete(skill)
-    db.commit()
+    commit_profile_change(db, profile_id)
     
     return None
 
 
 # ===== Social Links Endpoints =====
 
-@app.get("/social-links", response_model=List[SocialLinkResponse], tags=["Social Links"])
+@app.get("/social-links", response_model=List[SocialLinkResponse], tags=["Social Links"], dependencies=[Depends(conditional_get)])
 def read_social_links(db: Session = Depends(get_db)):
     """Get all social links"""
-    profile = db.query(Profile).first()
+    profile = profile_query(db, Profile.social_links).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
@@ -653,7 +677,7 @@ def create_social_link(
     
     link = SocialLink(profile_id=profile.id, **link_data.model_dump())
     db.add(link)
-    db.commit()
+    commit_profile_change(db, profile.id)
     db.refresh(link)
     
     return link
@@ -674,7 +698,7 @@ def update_social_link(
     for key, value in link_data.model_dump(exclude_unset=True).items():
         setattr(link, key, value)
     
-    db.commit()
+    commit_profile_change(db, link.profile_id)
     db.refresh(link)
     
     return link
@@ -691,66 +715,42 @@ def delete_social_link(
     if not link:
         raise HTTPException(status_code=404, detail="Social link not found")
     
+    profile_id = link.profile_id
     db.delete(link)
-    db.commit()
+    commit_profile_change(db, profile_id)
     
     return None
 
 
 # ===== Search Endpoint =====
-@app.get("/search", response_model=List[SearchResult], tags=["Search"])
+@app.get("/search", response_model=List[SearchResult], tags=["Search"], dependencies=[Depends(conditional_get)])
 def search_content(
     q: str = Query(..., min_length=1, description="Search query"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
     db: Session = Depends(get_db)
 ):
-    """Global search across projects and work experience"""
-    search_term = f"%{q.lower()}%"
-    results = []
-    
-    projects = db.query(Project).filter(
-        or_(
-            func.lower(Project.name).like(search_term),
-            func.lower(Project.description).like(search_term)
-        )
-    ).all()
-    
-    for project in projects:
-        score = 1.0
-        if project.name and q.lower() in project.name.lower():
-            score += 0.5
-        
-        results.append(SearchResult(
-            type="project",
-            id=project.id,
-            title=project.name,
-            description=project.description,
-            relevance_score=score
-        ))
-    
-    work_experiences = db.query(WorkExperience).filter(
-        or_(
-            func.lower(WorkExperience.position).like(search_term),
-            func.lower(WorkExperience.description).like(search_term),
-            func.lower(WorkExperience.company).like(search_term)
-        )
-    ).all()
-    
-    for work in work_experiences:
-        score = 1.0
-        if work.position and q.lower() in work.position.lower():
-            score += 0.5
-        
-        results.append(SearchResult(
-            type="work_experience",
-            id=work.id,
-            title=f"{work.position} at {work.company}",
-            description=work.description,
-            relevance_score=score
-        ))
+    """
+    Global full-text search across projects, work experience, education, skills and social links
     
-    results.sort(key=lambda x: x.relevance_score, reverse=True)
+    Every word must match (as a prefix). Results are ranked by relevance, with
+    names and positions weighted above descriptions, and include a highlighted snippet
+    """
+    return search(db, q, limit)
+
+
+# ===== Query Count Report =====
+@app.get("/metrics/queries", tags=["System"])
+def query_report(reset: bool = Query(False, description="Clear the counts after reading them")):
+    """
+    SQL statements executed per endpoint since startup
     
-    return results
+    Returns:
+        Per endpoint: requests, last, min, max and mean query count
+    """
+    report = QUERY_STATS.report()
+    if reset:
+        QUERY_STATS.reset()
+    return report
 
 
 # ===== Root Endpoint =====
@@ -764,6 +764,7 @@ def root():
         "documentation": "/docs",
         "endpoints": {
             "health": "/health",
+            "query_report": "/metrics/queries",
             "profile": {
                 "read": "GET /profile",
                 "create": "POST /profile (auth required)",
@@ -0,0 +1,68 @@
+"""
+Alembic Environment
+Runs migrations against DATABASE_URL, or against the connection passed in by init_db
+"""
+import re
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import engine
+from models import Base
+
+config = context.config
+
+# Only configure logging when run from the alembic CLI, not from the running app
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Full-text search objects from revision 0001 (FTS5 tables and their shadow tables,
+# tsvector columns and GIN indexes); they are not in the models
+FTS_TABLE = re.compile(r"_fts(_(data|idx|docsize|config|content))?$")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep the search objects out of `alembic revision --autogenerate`"""
+    if type_ == "table" and reflected and compare_to is None and FTS_TABLE.search(name):
+        return False
+    if type_ == "column" and name == "search_vector":
+        return False
+    if type_ == "index" and name.endswith("_search_vector"):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting (alembic upgrade head --sql)"""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run migrations on the connection from init_db, or on a new one from the app engine"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,108 @@
+"""Full-text search indexes
+
+PostgreSQL: a weighted tsvector generated column and a GIN index per searchable table.
+SQLite: an FTS5 external-content table per searchable table, kept current by triggers.
+
+The tables themselves are created by init_db (Base.metadata.create_all).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Searchable columns and their weights, as of this revision (search.SEARCH_SOURCES)
+SEARCH_FIELDS = {
+    "projects": [("name", "A"), ("description", "B")],
+    "work_experience": [("position", "A"), ("company", "B"), ("description", "C")],
+    "education": [("degree", "A"), ("institution", "A"), ("field", "B"), ("description", "C")],
+    "skills": [("name", "A"), ("category", "B"), ("level", "C")],
+    "social_links": [("platform", "A"), ("url", "B")],
+}
+
+
+def _tsvector(fields) -> str:
+    return " || ".join(
+        f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+        for column, weight in fields
+    )
+
+
+def _upgrade_postgresql():
+    for table, fields in SEARCH_FIELDS.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({_tsvector(fields)}) STORED"
+        )
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)")
+
+
+def _downgrade_postgresql():
+    for table in SEARCH_FIELDS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+
+
+def _upgrade_sqlite():
+    for table, fields in SEARCH_FIELDS.items():
+        fts = f"{table}_fts"
+        columns = ", ".join(column for column, _ in fields)
+        new_values = ", ".join(f"new.{column}" for column, _ in fields)
+        old_values = ", ".join(f"old.{column}" for column, _ in fields)
+
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{columns}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        # Index the rows that already exist
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _downgrade_sqlite():
+    for table in SEARCH_FIELDS:
+        fts = f"{table}_fts"
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == "postgresql":
+        _upgrade_postgresql()
+    elif dialect == "sqlite":
+        _upgrade_sqlite()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == "postgresql":
+        _downgrade_postgresql()
+    elif dialect == "sqlite":
+        _downgrade_sqlite()
@@ -0,0 +1,36 @@
+"""Profile version column
+
+profiles.version is bumped by every write and drives the ETags of the
+read endpoints. Databases created since the column was added to the model
+already have it (create_all), so it is only added when missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("profiles")}
+    if "version" not in columns:
+        op.add_column("profiles", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # batch mode rebuilds the table on SQLite versions without DROP COLUMN
+    with op.batch_alter_table("profiles") as batch_op:
+        batch_op.drop_column("version")
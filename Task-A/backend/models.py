@@ -3,7 +3,7 @@ Database Models for Me-API Playground
 Defines all SQLAlchemy models with relationships
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Table, LargeBinary
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -29,6 +29,7 @@ class Profile(Base):
     bio = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped by every write, drives ETags
     
     # Relationships
     education = relationship("Education", back_populates="profile", cascade="all, delete-orphan")
@@ -36,6 +37,7 @@ class Profile(Base):
     projects = relationship("Project", back_populates="profile", cascade="all, delete-orphan")
     skills = relationship("Skill", back_populates="profile", cascade="all, delete-orphan")
     social_links = relationship("SocialLink", back_populates="profile", cascade="all, delete-orphan")
+    snapshot = relationship("ProfileSnapshot", back_populates="profile", cascade="all, delete-orphan", uselist=False)
 
 
 class Education(Base):
@@ -122,3 +124,16 @@ class SocialLink(Base):
     
     # Relationships
     profile = relationship("Profile", back_populates="social_links")
+
+
+class ProfileSnapshot(Base):
+    """Serialized GET /profile response, rebuilt in the same transaction as every write"""
+    __tablename__ = 'profile_snapshots'
+    
+    profile_id = Column(Integer, ForeignKey('profiles.id', ondelete='CASCADE'), primary_key=True)
+    version = Column(Integer, nullable=False)  # profiles.version the body was built from
+    body = Column(LargeBinary, nullable=False)  # JSON bytes of ProfileResponse
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    profile = relationship("Profile", back_populates="snapshot")
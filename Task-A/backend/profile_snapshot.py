@@ -0,0 +1,101 @@
+"""
+Materialized Profile Snapshot
+The serialized GET /profile response, stored in profile_snapshots and rebuilt
+in the same transaction as every write, so reads skip the joins and validation
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from conditional import bump_profile_version
+from loaders import profile_query
+from models import Profile, ProfileSnapshot
+from schemas import ProfileResponse
+
+
+def build_profile_body(db: Session, profile_id: int) -> Optional[Tuple[bytes, int]]:
+    """
+    Serialize the complete profile exactly as GET /profile returns it, with
+    the profile version it was built from
+
+    populate_existing reloads rows already in the session, so the body reflects
+    everything flushed so far in this transaction
+    """
+    profile = profile_query(db).filter(Profile.id == profile_id).populate_existing().first()
+    if profile is None:
+        return None
+    body = ProfileResponse.model_validate(profile).model_dump_json().encode("utf-8")
+    return body, profile.version
+
+
+def refresh_profile_snapshot(db: Session, profile_id: int) -> Optional[bytes]:
+    """
+    Rebuild the stored snapshot from the current (flushed) state
+
+    Returns:
+        The serialized profile, or None if the profile does not exist
+    """
+    built = build_profile_body(db, profile_id)
+    if built is None:
+        return None
+    body, version = built
+
+    snapshot = db.get(ProfileSnapshot, profile_id)
+    if snapshot is None:
+        snapshot = ProfileSnapshot(profile_id=profile_id)
+        db.add(snapshot)
+    snapshot.version = version
+    snapshot.body = body
+    snapshot.updated_at = datetime.utcnow()
+    return body
+
+
+def commit_profile_change(db: Session, profile_id: int) -> Optional[bytes]:
+    """
+    Commit a write to the profile or any of its records
+
+    Bumps the profile version and rebuilds the snapshot before committing, so
+    the change, the new version and the new snapshot are committed together
+
+    Returns:
+        The new serialized profile
+    """
+    bump_profile_version(db, profile_id)
+    db.flush()
+    body = refresh_profile_snapshot(db, profile_id)
+    db.commit()
+    return body
+
+
+def read_profile_snapshot(db: Session) -> Optional[bytes]:
+    """
+    Serialized profile for GET /profile: one query while the snapshot is current
+
+    Falls back to building (and storing) the snapshot when it is missing or
+    older than the profile, e.g. after seed.py or on a database created
+    before snapshots existed
+
+    Returns:
+        The serialized profile, or None if no profile exists
+    """
+    current = (
+        db.query(ProfileSnapshot.body)
+        .join(Profile, Profile.id == ProfileSnapshot.profile_id)
+        .filter(ProfileSnapshot.version == Profile.version)
+        .first()
+    )
+    if current is not None:
+        return current.body
+
+    profile = db.query(Profile.id).first()
+    if profile is None:
+        return None
+    body = refresh_profile_snapshot(db, profile.id)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request stored the same snapshot first
+        db.rollback()
+    return body
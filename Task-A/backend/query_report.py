@@ -0,0 +1,106 @@
+"""
+Query Count Report
+Seeds a scratch SQLite database at several profile sizes and prints the number
+of SQL statements each read endpoint executes
+
+Usage:
+    python query_report.py
+    python query_report.py --projects 5,50,500 --skills-per-project 4
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+READ_ENDPOINTS = [
+    "/profile",
+    "/education",
+    "/work-experience",
+    "/projects",
+    "/projects?status=completed",
+    "/projects/{project_id}",
+    "/skills",
+    "/skills/top",
+    "/social-links",
+    "/search?q=project",
+]
+
+
+def seed(db, projects: int, skills_per_project: int):
+    """Create one profile with `projects` projects, each linked to a few skills"""
+    from models import Profile, Education, WorkExperience, Project, Skill, SocialLink
+
+    profile = Profile(name="Query Report", email="report@example.com", bio="Synthetic profile")
+    db.add(profile)
+    db.flush()
+
+    skills = [Skill(profile_id=profile.id, name=f"skill-{i}", level="advanced") for i in range(max(skills_per_project, 10))]
+    db.add_all(skills)
+    db.add_all([Education(profile_id=profile.id, institution=f"University {i}", degree="BSc") for i in range(3)])
+    db.add_all([WorkExperience(profile_id=profile.id, company=f"Company {i}", position="Engineer") for i in range(5)])
+    db.add_all([SocialLink(profile_id=profile.id, platform=f"site-{i}", url=f"https://example.com/{i}") for i in range(3)])
+
+    for i in range(projects):
+        project = Project(profile_id=profile.id, name=f"Project {i}", description=f"Synthetic project {i}", status="completed")
+        project.skills.extend(skills[(i + j) % len(skills)] for j in range(skills_per_project))
+        db.add(project)
+    db.commit()
+
+
+def run(sizes, skills_per_project: int) -> dict:
+    """Return {projects: {endpoint: query_count}} for each profile size"""
+    results = {}
+    for projects in sizes:
+        # database.py reads DATABASE_URL at import time: re-import every backend module per size
+        for name, module in list(sys.modules.items()):
+            if os.path.dirname(os.path.abspath(getattr(module, "__file__", None) or "")) == BACKEND_DIR:
+                del sys.modules[name]
+        path = os.path.join(tempfile.mkdtemp(), "query_report.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+        from fastapi.testclient import TestClient
+        from database import SessionLocal, init_db, QUERY_STATS
+        from models import Project
+        import main
+
+        init_db()
+        db = SessionLocal()
+        try:
+            seed(db, projects, skills_per_project)
+            project_id = db.query(Project.id).first()[0]
+        finally:
+            db.close()
+
+        client = TestClient(main.app)
+        counts = {}
+        for endpoint in READ_ENDPOINTS:
+            url = endpoint.format(project_id=project_id)
+            # The first GET /profile builds the snapshot of the seeded data: measure the second request
+            client.get(url)
+            response = client.get(url)
+            response.raise_for_status()
+            counts[endpoint] = int(response.headers["X-Query-Count"])
+        QUERY_STATS.reset()
+        results[projects] = counts
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report SQL statements per read endpoint.")
+    parser.add_argument("--projects", default="1,10,100", help="Comma-separated profile sizes (number of projects)")
+    parser.add_argument("--skills-per-project", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    sizes = [int(n) for n in args.projects.split(",")]
+    results = run(sizes, args.skills_per_project)
+
+    print(f"{'endpoint':<30}" + "".join(f"{f'{n} proj':>10}" for n in sizes))
+    for endpoint in READ_ENDPOINTS:
+        print(f"{endpoint:<30}" + "".join(f"{results[n][endpoint]:>10}" for n in sizes))
+
+
+if __name__ == "__main__":
+    main()
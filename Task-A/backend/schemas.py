@@ -202,6 +202,7 @@ class SearchResult(BaseModel):
     title: str
     description: Optional[str]
     relevance_score: float = 1.0
+    snippet: Optional[str] = None  # Matching text with terms wrapped in <b></b>
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,188 @@
+"""
+Full-Text Search
+Ranked search across projects, work experience, education, skills and social links
+
+PostgreSQL: weighted tsvector generated columns with GIN indexes, ts_rank, ts_headline
+SQLite (local runs): FTS5 external-content tables kept current by triggers, bm25, snippet()
+Both are created by the Alembic migration in migrations/versions
+"""
+import logging
+import re
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from schemas import SearchResult
+
+
+logger = logging.getLogger(__name__)
+
+
+# Searchable columns per record type with their weight (A highest); must match
+# the columns indexed by the migration. title/description refer to the table as t.
+SEARCH_SOURCES = [
+    {
+        "type": "project",
+        "table": "projects",
+        "title": "t.name",
+        "description": "t.description",
+        "fields": [("name", "A"), ("description", "B")],
+    },
+    {
+        "type": "work_experience",
+        "table": "work_experience",
+        "title": "t.position || ' at ' || t.company",
+        "description": "t.description",
+        "fields": [("position", "A"), ("company", "B"), ("description", "C")],
+    },
+    {
+        "type": "education",
+        "table": "education",
+        "title": "t.degree || ' at ' || t.institution",
+        "description": "t.description",
+        "fields": [("degree", "A"), ("institution", "A"), ("field", "B"), ("description", "C")],
+    },
+    {
+        "type": "skill",
+        "table": "skills",
+        "title": "t.name",
+        "description": "t.category",
+        "fields": [("name", "A"), ("category", "B"), ("level", "C")],
+    },
+    {
+        "type": "social_link",
+        "table": "social_links",
+        "title": "t.platform",
+        "description": "t.url",
+        "fields": [("platform", "A"), ("url", "B")],
+    },
+]
+
+# bm25 column weights for SQLite, mirroring ts_rank's default {0.1, 0.2, 0.4, 1.0} for D..A
+SQLITE_WEIGHTS = {"A": 10.0, "B": 4.0, "C": 2.0, "D": 1.0}
+
+HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxWords=30, MinWords=10, MaxFragments=2"
+
+
+def _terms(q: str) -> List[str]:
+    """Words of the query; punctuation and operators are dropped"""
+    return re.findall(r"\w+", q.lower())
+
+
+def _postgres_sql() -> str:
+    ranked = " UNION ALL ".join(
+        f"SELECT '{source['type']}' AS type, t.id AS id, {source['title']} AS title, "
+        f"{source['description']} AS description, ts_rank(t.search_vector, query) AS score "
+        f"FROM {source['table']} AS t, to_tsquery('english', :query) AS query "
+        f"WHERE t.search_vector @@ query"
+        for source in SEARCH_SOURCES
+    )
+    # ts_headline re-parses the text, so it only runs on the rows that are returned
+    return (
+        f"SELECT type, id, title, description, score, "
+        f"ts_headline('english', concat_ws(' · ', title, description), to_tsquery('english', :query), :options) AS snippet "
+        f"FROM ({ranked} ORDER BY score DESC LIMIT :limit) AS ranked ORDER BY score DESC"
+    )
+
+
+def _sqlite_sql() -> str:
+    selects = []
+    for source in SEARCH_SOURCES:
+        fts = f"{source['table']}_fts"
+        weights = ", ".join(str(SQLITE_WEIGHTS[weight]) for _, weight in source["fields"])
+        # bm25 is lower-is-better: negate it so higher scores rank first, as with ts_rank
+        selects.append(
+            f"SELECT '{source['type']}' AS type, t.id AS id, {source['title']} AS title, "
+            f"{source['description']} AS description, -bm25({fts}, {weights}) AS score, "
+            f"snippet({fts}, -1, '<b>', '</b>', '…', 16) AS snippet "
+            f"FROM {fts} JOIN {source['table']} AS t ON t.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :query"
+        )
+    return " UNION ALL ".join(selects) + " ORDER BY score DESC LIMIT :limit"
+
+
+def _full_text_search(db: Session, terms: List[str], limit: int) -> List[SearchResult]:
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        # Prefix matching on every word, so partial words still match (like the old LIKE search)
+        query = " & ".join(f"{term}:*" for term in terms)
+        rows = db.execute(
+            text(_postgres_sql()),
+            {"query": query, "limit": limit, "options": HEADLINE_OPTIONS}
+        ).mappings().all()
+    elif dialect == "sqlite":
+        query = " ".join(f'"{term}"*' for term in terms)
+        rows = db.execute(text(_sqlite_sql()), {"query": query, "limit": limit}).mappings().all()
+    else:
+        raise NotImplementedError(f"No full-text search for {dialect}")
+
+    return [
+        SearchResult(
+            type=row["type"],
+            id=row["id"],
+            title=row["title"],
+            description=row["description"],
+            relevance_score=float(row["score"]),
+            snippet=row["snippet"],
+        )
+        for row in rows
+    ]
+
+
+def _like_sql() -> str:
+    selects = []
+    for source in SEARCH_SOURCES:
+        matches = " OR ".join(f"lower(t.{column}) LIKE :term" for column, _ in source["fields"])
+        # Bonus for a match on a top-weighted field (name, position...), as in the original substring search
+        title_matches = " OR ".join(
+            f"lower(t.{column}) LIKE :term" for column, weight in source["fields"] if weight == "A"
+        )
+        selects.append(
+            f"SELECT '{source['type']}' AS type, t.id AS id, {source['title']} AS title, "
+            f"{source['description']} AS description, "
+            f"CASE WHEN {title_matches} THEN 1.5 ELSE 1.0 END AS score "
+            f"FROM {source['table']} AS t WHERE {matches}"
+        )
+    return " UNION ALL ".join(selects) + " ORDER BY score DESC LIMIT :limit"
+
+
+def _like_search(db: Session, q: str, limit: int) -> List[SearchResult]:
+    """Substring search over the same records and fields, for databases without the search index"""
+    rows = db.execute(text(_like_sql()), {"term": f"%{q.lower()}%", "limit": limit}).mappings().all()
+
+    return [
+        SearchResult(
+            type=row["type"],
+            id=row["id"],
+            title=row["title"],
+            description=row["description"],
+            relevance_score=float(row["score"]),
+        )
+        for row in rows
+    ]
+
+
+def search(db: Session, q: str, limit: int = 20) -> List[SearchResult]:
+    """
+    Ranked full-text search, best match first
+
+    Falls back to substring search if the database has no search index
+    (unsupported dialect, or migrations not applied)
+
+    Args:
+        db: Database session
+        q: Search query; every word must match, as a prefix
+        limit: Maximum number of results
+    """
+    terms = _terms(q)
+    if not terms:
+        return []
+
+    try:
+        return _full_text_search(db, terms, limit)
+    except (NotImplementedError, OperationalError, ProgrammingError) as e:
+        db.rollback()
+        logger.warning("Full-text search unavailable, using substring search: %s", getattr(e, "orig", e))
+        return _like_search(db, q, limit)
@@ -90,12 +90,36 @@ st.markdown("""
 
 
 # ===== API Helper Functions =====
+@st.cache_resource
+def get_validator_cache() -> Dict:
+    """Last ETag and body per request, shared across reruns and sessions"""
+    return {}
+
+
+def conditional_get(path: str, params: Optional[Dict] = None, timeout: int = 10):
+    """
+    GET with If-None-Match: the backend answers 304 with no body while the
+    profile is unchanged, and the cached body is reused
+    """
+    cache = get_validator_cache()
+    key = (path, tuple(sorted((params or {}).items())))
+    cached = cache.get(key)
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    
+    response = requests.get(f"{API_BASE_URL}{path}", params=params, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        return cached["data"]
+    response.raise_for_status()
+    data = response.json()
+    if response.headers.get("ETag"):
+        cache[key] = {"etag": response.headers["ETag"], "data": data}
+    return data
+
+
 def get_profile() -> Optional[Dict]:
     """Fetch profile data from API"""
     try:
-        response = requests.get(f"{API_BASE_URL}/profile", timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return conditional_get("/profile")
     except requests.exceptions.RequestException as e:
         st.error(f"Failed to fetch profile: {str(e)}")
         return None
@@ -110,9 +134,7 @@ def get_projects(skill: Optional[str] = None, status: Optional[str] = None) -> L
         if status:
             params['status'] = status
         
-        response = requests.get(f"{API_BASE_URL}/projects", params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return conditional_get("/projects", params=params)
     except requests.exceptions.RequestException as e:
         st.error(f"Failed to fetch projects: {str(e)}")
         return []
@@ -121,16 +143,14 @@ def get_projects(skill: Optional[str] = None, status: Optional[str] = None) -> L
 def get_top_skills(limit: int = 10) -> List[Dict]:
     """Fetch top skills by project count"""
     try:
-        response = requests.get(f"{API_BASE_URL}/skills/top", params={"limit": limit}, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return conditional_get("/skills/top", params={"limit": limit})
     except requests.exceptions.RequestException as e:
         st.error(f"Failed to fetch top skills: {str(e)}")
         return []
 
 
 def search_content(query: str) -> List[Dict]:
-    """Search across projects and work experience"""
+    """Full-text search across projects, experience, education, skills and links"""
     try:
         response = requests.get(f"{API_BASE_URL}/search", params={"q": query}, timeout=10)
         response.raise_for_status()
@@ -455,7 +475,7 @@ def main():
         st.title("Search Portfolio")
         
         search_query = st.text_input(
-            "Search projects and work experience",
+            "Search projects, experience, education, skills and links",
             placeholder="e.g., React, API, microservices..."
         )
         
@@ -465,14 +485,19 @@ def main():
             
             if results:
                 st.success(f"Found {len(results)} result(s)")
+                # Scores are only comparable within one search: show them relative to the best match
+                top_score = max(result.get('relevance_score') or 0 for result in results) or 1
                 
                 for result in results:
+                    stars = 1 + round(4 * (result.get('relevance_score') or 0) / top_score)
+                    snippet = (result.get('snippet') or result.get('description') or 'No description')
+                    snippet = snippet.replace('<b>', '**').replace('</b>', '**')
                     st.markdown(f"""
                     ### {result['title']}
                     **Type:** {result['type'].replace('_', ' ').title()}  
-                    **Relevance:** {'⭐' * int(result.get('relevance_score', 1))}
+                    **Relevance:** {'⭐' * stars}
                     
-                    {result.get('description', 'No description')}
+                    {snippet}
                     """)
                     st.markdown("---")
             else:
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+from config import Config
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Request/response log for provider calls (Gemini embeddings and chat, Cohere
+    rerank, vector store queries), stored as JSON lines.
+    - record: calls go to the provider; each request/response pair and its latency is appended.
+    - replay: calls are answered from the file, offline, after sleeping either the recorded
+      latency or a synthetic per-provider latency (CASSETTE_LATENCY).
+    """
+
+    def __init__(self, path: str = None, mode: str = None, latency: str = None):
+        self.path = path or Config.CASSETTE_PATH
+        self.mode = mode or Config.CASSETTE_MODE
+        self.latency = latency or Config.CASSETTE_LATENCY
+        self._lock = threading.Lock()
+        self.entries: dict = {}
+        self.misses = 0
+
+        if self.mode == "replay":
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"Cassette not found: {self.path}")
+            with open(self.path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+        elif self.mode == "record":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def call(self, kind: str, request: dict, fn):
+        """Runs (record) or looks up (replay) one provider call identified by kind + request."""
+        key = _digest([kind, request])
+
+        if self.replaying:
+            entry = self.entries.get(key)
+            if entry is None:
+                with self._lock:
+                    self.misses += 1
+                raise LookupError(f"No recorded {kind} response in {self.path} for this request")
+            if self.latency == "recorded":
+                time.sleep(entry["latency"])
+            elif self.latency == "synthetic":
+                time.sleep(Config.CASSETTE_SYNTHETIC_LATENCY[kind])
+            return entry["response"]
+
+        start_time = time.time()
+        response = fn()
+        entry = {
+            "key": key,
+            "kind": kind,
+            "request": request,
+            "response": response,
+            "latency": round(time.time() - start_time, 4),
+        }
+        with self._lock:
+            self.entries[key] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        return response
+
+
+_CASSETTE = None
+_CASSETTE_LOCK = threading.Lock()
+
+
+def get_cassette():
+    """The process-wide cassette, or None when CASSETTE_MODE is "off"."""
+    global _CASSETTE
+    if Config.CASSETTE_MODE == "off":
+        return None
+    with _CASSETTE_LOCK:
+        if _CASSETTE is None:
+            _CASSETTE = Cassette()
+        return _CASSETTE
+
+
+class CassetteEmbeddings(Embeddings):
+    """Records/replays embedding calls. `inner` may be None when replaying."""
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def embed_query(self, text: str) -> list[float]:
+        request = {"model": Config.EMBEDDING_MODEL, "query": _digest(text)}
+        return self.cassette.call("embed", request, lambda: self.inner.embed_query(text))
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        request = {"model": Config.EMBEDDING_MODEL, "documents": [_digest(t) for t in texts]}
+        return self.cassette.call("embed", request, lambda: self.inner.embed_documents(texts))
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        request = {"model": Config.EMBEDDING_MODEL, "queries": [_digest(t) for t in texts]}
+        return self.cassette.call(
+            "embed", request, lambda: self.inner.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+        )
+
+
+class CassetteChatModel(Runnable):
+    """
+    Records/replays chat completions. Composes with prompts (`prompt | model`)
+    like the wrapped ChatGoogleGenerativeAI; `inner` may be None when replaying.
+    """
+
+    def __init__(self, inner, model: str, cassette: Cassette):
+        self.inner = inner
+        self.model = model
+        self.cassette = cassette
+
+    def invoke(self, input, config=None, **kwargs):
+        prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+        request = {"model": self.model, "prompt": prompt}
+        content = self.cassette.call(
+            "chat", request, lambda: self.inner.invoke(input, config, **kwargs).content
+        )
+        return AIMessage(content=content)
+
+
+class CassetteReranker:
+    """Records/replays Cohere rerank calls; `inner` may be None when replaying."""
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def rerank(self, documents, query: str, top_n: int = -1, **kwargs):
+        request = {
+            "model": Config.RERANKER_MODEL,
+            "query": query,
+            "documents": [_digest(d) for d in documents],
+            "top_n": top_n,
+        }
+        return self.cassette.call(
+            "rerank", request, lambda: list(self.inner.rerank(documents, query, top_n=top_n, **kwargs))
+        )
+
+
+def _dump_scored(results) -> list:
+    return [
+        {"page_content": doc.page_content, "metadata": doc.metadata, "id": doc.id, "score": score}
+        for doc, score in results
+    ]
+
+
+def _load_scored(payload) -> list:
+    return [
+        (Document(page_content=r["page_content"], metadata=r["metadata"], id=r["id"]), r["score"])
+        for r in payload
+    ]
+
+
+class CassetteVectorStore:
+    """
+    Records/replays vector store reads and writes. Unwrapped attributes (e.g. a
+    compact store's docstore) are delegated to the inner store when there is one.
+    """
+
+    def __init__(self, inner, cassette: Cassette, docstore=None, embeddings=None):
+        self.inner = inner
+        self.cassette = cassette
+        if docstore is not None:
+            self.docstore = docstore
+        if embeddings is not None:
+            self.embeddings = embeddings
+
+    def __getattr__(self, name):
+        inner = self.__dict__.get("inner")
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner, name)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        request = {"method": "similarity_search_with_score", "query": query, "k": k, "filter": filter}
+        payload = self.cassette.call(
+            "vector", request,
+            lambda: _dump_scored(self.inner.similarity_search_with_score(query, k=k, filter=filter, **kwargs))
+        )
+        return _load_scored(payload)
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        request = {"method": "similarity_search_by_vector_with_score", "vector": _digest(embedding), "k": k, "filter": filter}
+        payload = self.cassette.call(
+            "vector", request,
+            lambda: _dump_scored(self.inner.similarity_search_by_vector_with_score(embedding, k=k, filter=filter, **kwargs))
+        )
+        return _load_scored(payload)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        request = {"method": "similarity_search", "query": query, "k": k, "filter": filter}
+        payload = self.cassette.call(
+            "vector", request,
+            lambda: _dump_scored((doc, None) for doc in self.inner.similarity_search(query, k=k, filter=filter, **kwargs))
+        )
+        return [doc for doc, _ in _load_scored(payload)]
+
+    def add_documents(self, documents, ids=None, **kwargs):
+        documents = list(documents)
+        request = {
+            "method": "add_documents",
+            "documents": [_digest(doc.page_content) for doc in documents],
+            "ids": ids,
+        }
+        return self.cassette.call(
+            "vector", request, lambda: list(self.inner.add_documents(documents, ids=ids, **kwargs))
+        )
+
+    def save(self, path: str = None):
+        """Persists the inner store; replay has no inner store and nothing to persist."""
+        if self.inner is not None:
+            self.inner.save(path)
@@ -0,0 +1,117 @@
+"""
+Benchmark of the chunking modes.
+
+    python chunk_benchmark.py ./knowledge_base
+    python chunk_benchmark.py --synthetic-mb 20
+
+For each mode reports throughput (MB/s of text) and the spread of chunk sizes in
+tokens, which is what drives prompt-size predictability:
+- characters: the default 1000-character splitter
+- tokens:     split_text_by_tokens (tokenize once, cut on token offsets)
+- splitter:   LangChain's splitter with a tiktoken length function, which re-tokenizes
+              candidate chunks while merging (the approach token mode avoids)
+"""
+import time
+import random
+import argparse
+import numpy as np
+from config import Config
+from utils import get_encoding, split_text_by_tokens, extract_pdf_pages
+from ingest_cli import find_documents
+
+
+def load_texts(paths: list[str], synthetic_mb: float) -> list[str]:
+    if synthetic_mb:
+        rng = random.Random(0)
+        words = [f"word{i}" for i in range(5000)] + ["the", "of", "and", "data", "model", "results"]
+        texts, size = [], 0
+        while size < synthetic_mb * 1e6:
+            paragraphs = [
+                ". ".join(" ".join(rng.choices(words, k=rng.randint(8, 25))) for _ in range(rng.randint(2, 8))) + "."
+                for _ in range(20)
+            ]
+            texts.append("\n\n".join(paragraphs))
+            size += len(texts[-1])
+        return texts
+
+    texts = []
+    for root in paths:
+        for path in find_documents(root):
+            with open(path, "rb") as f:
+                data = f.read()
+            if path.lower().endswith(".pdf"):
+                texts.append("".join(extract_pdf_pages(data)))
+            else:
+                texts.append(data.decode("utf-8", errors="replace"))
+    return texts
+
+
+def character_chunks(text: str) -> list[str]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100, length_function=len)
+    return splitter.split_text(text)
+
+
+def token_chunks(text: str) -> list[str]:
+    return [chunk for chunk, _ in split_text_by_tokens(text)]
+
+
+def splitter_chunks(text: str) -> list[str]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=Config.TOKENIZER_ENCODING,
+        chunk_size=Config.CHUNK_TOKENS,
+        chunk_overlap=Config.CHUNK_TOKEN_OVERLAP
+    )
+    return splitter.split_text(text)
+
+
+MODES = {"characters": character_chunks, "tokens": token_chunks, "splitter": splitter_chunks}
+
+
+def benchmark(mode: str, texts: list[str]) -> dict:
+    chunker = MODES[mode]
+    start_time = time.perf_counter()
+    chunks = [chunk for text in texts for chunk in chunker(text)]
+    elapsed = time.perf_counter() - start_time
+
+    # Measurement only: count tokens per chunk after the timed section
+    encoding = get_encoding()
+    sizes = np.array([len(encoding.encode_ordinary(chunk)) for chunk in chunks]) if chunks else np.zeros(1)
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(megabytes / max(elapsed, 1e-9), 2),
+        "chunks": len(chunks),
+        "tokens_min": int(sizes.min()),
+        "tokens_mean": round(float(sizes.mean()), 1),
+        "tokens_p95": int(np.percentile(sizes, 95)),
+        "tokens_max": int(sizes.max()),
+        "tokens_cv": round(float(sizes.std() / max(sizes.mean(), 1e-9)), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark character vs token chunking.")
+    parser.add_argument("paths", nargs="*", help="Directories of PDF/TXT files")
+    parser.add_argument("--synthetic-mb", type=float, default=0, help="Use ~N MB of generated text instead")
+    parser.add_argument("--modes", default="characters,tokens,splitter")
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.paths, args.synthetic_mb or (0 if args.paths else 5))
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+    print(f"{len(texts)} texts, {megabytes:.1f} MB")
+
+    split_text_by_tokens("warm-up")  # load the BPE ranks and token length table outside the timed sections
+    print(f"{'mode':<12}{'s':>8}{'MB/s':>8}{'chunks':>8}{'min':>6}{'mean':>8}{'p95':>6}{'max':>6}{'cv':>7}")
+    for mode in args.modes.split(","):
+        r = benchmark(mode, texts)
+        print(
+            f"{r['mode']:<12}{r['seconds']:>8}{r['mb_per_second']:>8}{r['chunks']:>8}"
+            f"{r['tokens_min']:>6}{r['tokens_mean']:>8}{r['tokens_p95']:>6}{r['tokens_max']:>6}{r['tokens_cv']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ class Config:
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 
+    # Vector Backend: "pinecone" (serverless) or "local" (in-process numpy search)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+
     # Pinecone Settings
     INDEX_NAME = "mini-rag-index"
     NAMESPACE = "niwesh-namespace"
@@ -18,18 +21,147 @@ class Config:
     CLOUD_PROVIDER = "aws"
     REGION = "us-east-1"
 
+    # Chunking: "characters" (1000 chars, 100 overlap) or "tokens" (tokenized once, cut on token offsets)
+    CHUNKING = os.getenv("CHUNKING", "characters")
+    TOKENIZER_ENCODING = "cl100k_base"
+    CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+    CHUNK_TOKEN_OVERLAP = 32
+    CHUNK_BOUNDARY_LOOKBACK = 0.15     # share of a window searched backwards for a paragraph/sentence break
+
+    # Compact Vector Metadata: vectors carry only IDs + filter fields, text lives in a local docstore
+    COMPACT_METADATA = os.getenv("COMPACT_METADATA", "false").lower() == "true"
+    VECTOR_METADATA_FIELDS = ("source", "chunk_id")
+    DOCSTORE_PATH = os.getenv("DOCSTORE_PATH", "docstore.sqlite3")
+    UPSERT_BATCH_SIZE = 100
+
+    # Resumable Ingestion (per-batch checkpoints, deterministic chunk IDs)
+    INGEST_BATCH_SIZE = 64
+    INGEST_CHECKPOINT_DIR = os.getenv("INGEST_CHECKPOINT_DIR", ".ingest_checkpoints")
+
+    # PDF Extraction Cache (per-page text keyed by file hash, compressed on disk)
+    EXTRACT_CACHE_ENABLED = os.getenv("EXTRACT_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", ".extract_cache")
+    EXTRACT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+    # Bulk Directory Ingestion CLI
+    BULK_PARSE_WORKERS = os.cpu_count() or 4
+    BULK_FLUSH_CHUNKS = 512            # chunks buffered before an embed + upsert round
+
+    # Namespace Snapshots (export/import without re-embedding)
+    SNAPSHOT_WORKERS = 8               # parallel Pinecone fetch/upsert requests
+    SNAPSHOT_FETCH_BATCH = 100         # IDs per Pinecone fetch
+    SNAPSHOT_LOCAL_BATCH = 5000        # rows per local add_vectors call
+
+    # Record/Replay Cassette for provider calls ("off", "record" or "replay")
+    CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")
+    CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/session.jsonl")
+    CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "recorded")  # "recorded", "synthetic" or "none"
+    CASSETTE_SYNTHETIC_LATENCY = {"embed": 0.15, "chat": 1.2, "rerank": 0.25, "vector": 0.08}
+
+    # Shared Work Executor (bounded pool for query/ingestion work from every session)
+    WORK_WORKERS = int(os.getenv("WORK_WORKERS", "16"))
+    WORK_MAX_QUEUE = int(os.getenv("WORK_MAX_QUEUE", "64"))    # waiting tasks before admission control
+    WORK_ADMISSION = os.getenv("WORK_ADMISSION", "wait")        # "wait" (bounded) or "reject"
+    WORK_MAX_WAIT_SECONDS = 10
+
     # Models
     EMBEDDING_MODEL = "models/text-embedding-004"
     LLM_MODEL = "gemini-2.5-flash"
     RERANKER_MODEL = "rerank-english-v3.0"
 
+    # Retrieval & Reranking
+    RETRIEVAL_K = 10
+    RERANK_TOP_N = 3
+    SEARCH_DEFAULT_K = 5               # passages returned by the retrieval-only mode
+
+    # Adaptive Reranking (skip/shrink Cohere when dense scores are decisive)
+    ADAPTIVE_RERANK = os.getenv("ADAPTIVE_RERANK", "true").lower() == "true"
+    RERANK_SKIP_MARGIN = 0.15          # top-1 minus top-2 cosine score
+    RERANK_SKIP_MAX_ENTROPY = 0.5      # normalized entropy of the score softmax
+    RERANK_SHRINK_MARGIN = 0.08
+    RERANK_SHRINK_K = 5
+    RERANK_ENTROPY_TEMPERATURE = 0.05
+    RERANK_DEADLINE_SECONDS = 2.0      # fall back to dense order past this
+
+    # Rerank Score Cache (per query/chunk pair, reused across overlapping candidate sets)
+    RERANK_CACHE_ENABLED = os.getenv("RERANK_CACHE_ENABLED", "true").lower() == "true"
+    RERANK_CACHE_SIZE = 20000          # (query, chunk) scores
+    RERANK_CACHE_TTL = 3600            # seconds
+
+    # Speculative Generation (generate on dense top-n while reranking runs)
+    SPECULATIVE_GENERATION = os.getenv("SPECULATIVE_GENERATION", "false").lower() == "true"
+
+    # LLM Routing (cheap local heuristics pick a fast or a strong model per query)
+    LLM_ROUTING = os.getenv("LLM_ROUTING", "false").lower() == "true"
+    LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gemini-2.5-flash-lite")
+    LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", LLM_MODEL)
+    LLM_PRICING_PER_1K_TOKENS = {
+        "gemini-2.5-flash-lite": 0.0000075,
+        "gemini-2.5-flash": 0.0000185,
+        "gemini-2.5-pro": 0.0000775,
+    }
+    ROUTER_MAX_FAST_CONTEXT_TOKENS = 1500
+    ROUTER_MAX_FAST_QUESTION_WORDS = 25
+    ROUTER_MIN_FAST_CONFIDENCE = 0.3
+
+    # Whole-Document Summarization (parallel map-reduce over every chunk)
+    SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", LLM_MODEL)
+    SUMMARY_CONCURRENCY = 4            # concurrent LLM calls, keeps us under RPM limits
+    SUMMARY_REDUCE_FANIN = 8           # summaries merged per reduce call
+    SUMMARY_MAX_CHUNKS = 1000
+    SUMMARY_CACHE_SIZE = 5000
+
+    # Multi-Query Expansion (paraphrases searched in parallel, merged by reciprocal rank fusion)
+    MULTI_QUERY = os.getenv("MULTI_QUERY", "false").lower() == "true"
+    MULTI_QUERY_GENERATOR = os.getenv("MULTI_QUERY_GENERATOR", "template")  # "template" or "llm"
+    MULTI_QUERY_MODEL = os.getenv("MULTI_QUERY_MODEL", LLM_FAST_MODEL)
+    MULTI_QUERY_COUNT = 3              # paraphrases in addition to the original question
+    RRF_K = 60                         # rank offset in 1 / (k + rank)
+
+    # Conversation Memory (recent turns verbatim, older turns folded into a running summary)
+    MEMORY_MODEL = os.getenv("MEMORY_MODEL", LLM_FAST_MODEL)
+    MEMORY_RECENT_TURNS = 3
+    MEMORY_TURN_MAX_CHARS = 1200       # per question/answer rendered into a prompt
+    MEMORY_SUMMARY_MAX_CHARS = 1500
+
+    # Near-Duplicate Elimination at ingest (MinHash + LSH)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD = 0.85             # estimated Jaccard similarity of word shingles
+    SHINGLE_SIZE = 5                   # words per shingle
+    MINHASH_PERMUTATIONS = 64
+    LSH_BANDS = 8                      # 8 bands x 8 rows, candidate threshold ~0.77
+
+    # Local Search (dimension-reduced shortlist, rescored at full width)
+    LOCAL_REDUCED_DIMENSION = int(os.getenv("LOCAL_REDUCED_DIMENSION", "0"))  # 0 = full width
+    LOCAL_REDUCTION = os.getenv("LOCAL_REDUCTION", "truncate")                 # "truncate" or "pca"
+    LOCAL_SHORTLIST_K = 100
+    LOCAL_PCA_MIN_SAMPLES = 1000       # PCA is fitted once this many vectors are indexed
+    LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "")                      # .npz file, "" = memory only
+
+    # Local Approximate Index (IVF, pure CPU): "flat" (exact scan) or "ivf"
+    LOCAL_INDEX = os.getenv("LOCAL_INDEX", "flat")
+    IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))     # 0 = 4 * sqrt(n) at training time
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))   # buckets scanned per query (recall vs latency)
+    IVF_TRAIN_MIN = 5000               # vectors needed before k-means training
+    IVF_TRAIN_SAMPLE = 100000
+    IVF_KMEANS_ITERATIONS = 20
+
     @staticmethod
-    def validate_keys():
-        """Checks if all required API keys are present."""
+    def missing_keys():
+        """Returns the names of required API keys that are not set."""
+        if Config.CASSETTE_MODE == "replay":
+            return []  # replay is fully offline
         missing_keys = []
         if not Config.GOOGLE_API_KEY: missing_keys.append("GOOGLE_API_KEY")
-        if not Config.PINECONE_API_KEY: missing_keys.append("PINECONE_API_KEY")
+        if not Config.PINECONE_API_KEY and Config.VECTOR_BACKEND == "pinecone":
+            missing_keys.append("PINECONE_API_KEY")
         if not Config.COHERE_API_KEY: missing_keys.append("COHERE_API_KEY")
+        return missing_keys
+
+    @staticmethod
+    def validate_keys():
+        """Checks if all required API keys are present."""
+        missing_keys = Config.missing_keys()
         
         if missing_keys:
             st.error(f"❌ Missing API Keys in .env: {', '.join(missing_keys)}")
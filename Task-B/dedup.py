@@ -0,0 +1,184 @@
+import re
+import random
+import threading
+import zlib
+from config import Config
+from utils import chunk_key
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str, size: int = None) -> set[int]:
+    """32-bit hashes of the word n-grams of a text (case and punctuation insensitive)."""
+    size = size or Config.SHINGLE_SIZE
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+class MinHasher:
+    """Universal-hash MinHash: signature[i] = min over shingles of (a_i * h + b_i) mod p."""
+
+    def __init__(self, num_perm: int = None, seed: int = 1):
+        self.num_perm = num_perm or Config.MINHASH_PERMUTATIONS
+        rng = random.Random(seed)
+        self.params = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(self.num_perm)
+        ]
+
+    def signature(self, text: str) -> tuple:
+        hashes = shingle_hashes(text)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.params
+        )
+
+
+def estimated_jaccard(sig_a: tuple, sig_b: tuple) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over MinHash signatures of ingested chunks.
+    Signatures are split into LSH_BANDS bands; chunks sharing any band bucket are
+    candidates, and a candidate is a duplicate when its estimated Jaccard similarity
+    reaches DEDUP_THRESHOLD. The first chunk seen stays canonical and collects
+    back-references to every duplicate that was dropped in its favour. The index
+    lives in memory: it starts empty in every process.
+    """
+
+    def __init__(self, num_perm: int = None, bands: int = None, threshold: float = None):
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands or Config.LSH_BANDS
+        self.rows = self.hasher.num_perm // self.bands
+        self.threshold = threshold or Config.DEDUP_THRESHOLD
+        self._lock = threading.Lock()
+        self.signatures: dict = {}      # canonical chunk key -> signature
+        self.sources: dict = {}         # canonical chunk key -> source name
+        self.buckets: dict = {}         # (band, band hash) -> [canonical chunk keys]
+        self.duplicates: dict = {}      # canonical chunk key -> [duplicate chunk keys]
+        self.canonical_of: dict = {}    # duplicate chunk key -> canonical chunk key
+
+    def duplicates_of(self, key: str) -> list:
+        """Keys of the chunks dropped in favour of a canonical chunk, across sources."""
+        with self._lock:
+            return list(self.duplicates.get(key, ()))
+
+    def _bands(self, signature: tuple):
+        for band in range(self.bands):
+            yield band, hash(signature[band * self.rows:(band + 1) * self.rows])
+
+    def _find(self, key: str, signature: tuple):
+        """Best canonical match for a signature, or None."""
+        candidates = set()
+        for bucket in self._bands(signature):
+            candidates.update(self.buckets.get(bucket, ()))
+        candidates.discard(key)
+
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            score = estimated_jaccard(signature, self.signatures[candidate])
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _add(self, key: str, signature: tuple, source: str):
+        self.signatures[key] = signature
+        self.sources[key] = source
+        for bucket in self._bands(signature):
+            self.buckets.setdefault(bucket, []).append(key)
+
+    def _remove(self, key: str):
+        signature = self.signatures.pop(key)
+        self.sources.pop(key, None)
+        for bucket in self._bands(signature):
+            members = self.buckets.get(bucket)
+            if members and key in members:
+                members.remove(key)
+                if not members:
+                    del self.buckets[bucket]
+
+    def _forget(self, key: str):
+        """Drops a chunk's signature and every duplicate link to or from it."""
+        if key in self.signatures:
+            self._remove(key)
+        # Chunks folded into this one were judged against its old text
+        for duplicate in self.duplicates.pop(key, ()):
+            self.canonical_of.pop(duplicate, None)
+        canonical = self.canonical_of.pop(key, None)
+        if canonical is not None:
+            back_refs = self.duplicates.get(canonical, [])
+            if key in back_refs:
+                back_refs.remove(key)
+            if not back_refs:
+                self.duplicates.pop(canonical, None)
+
+    def filter(self, docs) -> tuple[list, dict]:
+        """
+        Drops near-duplicate chunks, within the batch and against everything indexed before.
+        Every chunk is judged on its current text, so an edited chunk that used to be a
+        duplicate is kept again. Returns (kept documents, report). Canonical chunks kept
+        in the same batch as their duplicates carry the duplicate keys in
+        metadata["duplicates"]; duplicates_of() has every back-reference seen by this process.
+        """
+        kept = []
+        kept_by_key = {}
+        removed = 0
+        cross_source = 0
+
+        # Signatures are the expensive part and need no lock
+        signatures = [self.hasher.signature(doc.page_content) for doc in docs]
+
+        with self._lock:
+            for doc, signature in zip(docs, signatures):
+                key = chunk_key(doc)
+                source = doc.metadata.get("source")
+
+                # Re-ingesting an unchanged chunk is not a duplicate of itself
+                if self.signatures.get(key) == signature and self.sources.get(key) == source:
+                    kept.append(doc)
+                    kept_by_key[key] = doc
+                    continue
+
+                # Anything recorded for an older version of this chunk no longer holds:
+                # decide again from the new text
+                self._forget(key)
+                canonical = self._find(key, signature)
+                if canonical is None:
+                    self._add(key, signature, source)
+                    kept.append(doc)
+                    kept_by_key[key] = doc
+                    continue
+
+                removed += 1
+                if self.sources.get(canonical) != source:
+                    cross_source += 1
+                self.canonical_of[key] = canonical
+                back_refs = self.duplicates.setdefault(canonical, [])
+                if key not in back_refs:
+                    back_refs.append(key)
+                if canonical in kept_by_key:
+                    kept_by_key[canonical].metadata["duplicates"] = list(back_refs)
+
+        total = len(docs)
+        report = {
+            "total": total,
+            "kept": len(kept),
+            "removed": removed,
+            "cross_source": cross_source,
+            "removed_ratio": round(removed / total, 3) if total else 0.0,
+            "removed_chars": sum(len(d.page_content) for d in docs) - sum(len(d.page_content) for d in kept),
+        }
+        return kept, report
+
+
+# Process-wide: every session ingests into the same namespace
+DEDUP_INDEX = NearDuplicateIndex()
@@ -0,0 +1,102 @@
+import json
+import sqlite3
+import threading
+from langchain_core.documents import Document
+from config import Config
+
+
+class SQLiteDocstore:
+    """
+    Local chunk-text store keyed by chunk ID. Used with compact vector metadata:
+    the vector index only carries IDs and filter fields, and texts/full metadata
+    are fetched from here in one bulk query when a stage actually needs them.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.DOCSTORE_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                source TEXT,
+                chunk_id INTEGER,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source, chunk_id)")
+        self._conn.commit()
+
+    def put_many(self, ids: list[str], docs: list[Document]):
+        rows = [
+            (doc_id, doc.metadata.get("source"), doc.metadata.get("chunk_id"),
+             doc.page_content, json.dumps(doc.metadata))
+            for doc_id, doc in zip(ids, docs)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def get_many(self, ids: list[str]) -> dict:
+        """Returns {id: Document} for the IDs that exist, fetched in bulk."""
+        ids = list(ids)
+        rows = []
+        # Older SQLite builds cap bound parameters at 999 per statement
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(self._conn.execute(
+                    f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", batch
+                ).fetchall())
+        return {
+            doc_id: Document(page_content=text, metadata=json.loads(metadata), id=doc_id)
+            for doc_id, text, metadata in rows
+        }
+
+    def documents_for_source(self, source: str) -> list[Document]:
+        """Every chunk of a source in reading order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, text, metadata FROM chunks WHERE source = ? ORDER BY chunk_id", (source,)
+            ).fetchall()
+        return [
+            Document(page_content=text, metadata=json.loads(metadata), id=doc_id)
+            for doc_id, text, metadata in rows
+        ]
+
+    def delete_many(self, ids: list[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+
+def hydrate_documents(vectorstore, docs):
+    """
+    Fills in text and full metadata for documents returned by a compact store.
+    A no-op for stores that already carry chunk text with their vectors.
+    """
+    docstore = getattr(vectorstore, "docstore", None)
+    if docstore is None:
+        return docs
+
+    missing = [doc for doc in docs if not doc.page_content and doc.id]
+    if not missing:
+        return docs
+
+    found = docstore.get_many([doc.id for doc in missing])
+    for doc in missing:
+        stored = found.get(doc.id)
+        if stored is not None:
+            doc.page_content = stored.page_content
+            doc.metadata.update(stored.metadata)
+    return docs
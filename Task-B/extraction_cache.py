@@ -0,0 +1,88 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from config import Config
+
+try:
+    import zstandard
+except ImportError:  # optional: fall back to gzip from the standard library
+    zstandard = None
+
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted per-page text, keyed by the content hash of the
+    uploaded bytes (plus a parser version, so upgrades invalidate old entries).
+    Entries are compressed (zstd if installed, else gzip) and the directory is
+    kept under max_bytes by evicting the least recently used files.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = directory or Config.EXTRACT_CACHE_DIR
+        self.max_bytes = max_bytes or Config.EXTRACT_CACHE_MAX_BYTES
+        self.suffix = ".json.zst" if zstandard is not None else ".json.gz"
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, data: bytes, parser_version: str = "") -> str:
+        digest = hashlib.sha256(data)
+        digest.update(parser_version.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str):
+        """Cached list of page texts, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pages = json.loads(_decompress(f.read()))
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # mark as recently used
+        return pages
+
+    def set(self, key: str, pages: list[str]):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_compress(json.dumps(pages).encode("utf-8")))
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
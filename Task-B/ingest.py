@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+from config import Config
+from utils import chunk_key
+
+
+def ingestion_job_id(ids: list[str], docs) -> str:
+    """Identifies one ingestion by its chunk IDs and content, so an edited document starts a new job."""
+    digest = hashlib.sha1()
+    for doc_id, doc in zip(ids, docs):
+        digest.update(doc_id.encode("utf-8"))
+        digest.update(hashlib.sha1(doc.page_content.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class IngestionCheckpoint:
+    """JSON file recording which batches of a job have been committed to the vector store."""
+
+    def __init__(self, job_id: str, total_batches: int, directory: str = None):
+        directory = directory or Config.INGEST_CHECKPOINT_DIR
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{job_id}.json")
+        self.job_id = job_id
+        self.total_batches = total_batches
+        self.committed: set = set()
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            if state.get("total_batches") == total_batches:
+                self.committed = set(state.get("committed", []))
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.committed)
+
+    def commit(self, batch_index: int):
+        self.committed.add(batch_index)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "job_id": self.job_id,
+                "total_batches": self.total_batches,
+                "committed": sorted(self.committed),
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def finish(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def persist_store(vectorstore):
+    """Writes a local store to LOCAL_INDEX_PATH; other backends persist on every upsert."""
+    if Config.VECTOR_BACKEND == "local" and Config.LOCAL_INDEX_PATH:
+        vectorstore.save()
+
+
+def ingest_documents(vectorstore, docs, batch_size: int = None, progress=None, keep_checkpoint: bool = False) -> dict:
+    """
+    Adds documents to the vector store in checkpointed batches.
+    Vector IDs are deterministic (chunk_key), so re-running a batch is an idempotent
+    upsert. If ingestion fails part-way, calling this again with the same documents
+    skips the batches that were already committed.
+    `progress(done_batches, total_batches)` is called after each batch if given.
+    A local store is saved before each batch is checkpointed, so a batch is only ever
+    marked committed once its vectors are on disk.
+    With `keep_checkpoint` the checkpoint outlives a successful call (so a larger job made
+    of several calls can resume past it); the caller removes it with remove_checkpoint.
+    """
+    docs = list(docs)
+    batch_size = batch_size or Config.INGEST_BATCH_SIZE
+    ids = [chunk_key(doc) for doc in docs]
+    batches = [(start, min(start + batch_size, len(docs))) for start in range(0, len(docs), batch_size)]
+
+    checkpoint = IngestionCheckpoint(ingestion_job_id(ids, docs), len(batches))
+    report = {
+        "job_id": checkpoint.job_id,
+        "chunks": len(docs),
+        "batches": len(batches),
+        "resumed": checkpoint.resumed,
+        "skipped_batches": 0,
+        "skipped_chunks": 0,
+        "written_chunks": 0,
+    }
+
+    for batch_index, (start, end) in enumerate(batches):
+        if batch_index in checkpoint.committed:
+            report["skipped_batches"] += 1
+            report["skipped_chunks"] += end - start
+        else:
+            try:
+                vectorstore.add_documents(docs[start:end], ids=ids[start:end])
+                persist_store(vectorstore)
+            except Exception as e:
+                raise RuntimeError(
+                    f"Ingestion stopped at batch {batch_index + 1}/{len(batches)} "
+                    f"({report['written_chunks'] + report['skipped_chunks']} chunks committed); "
+                    f"retry to resume: {e}"
+                ) from e
+            checkpoint.commit(batch_index)
+            report["written_chunks"] += end - start
+
+        if progress:
+            progress(batch_index + 1, len(batches))
+
+    if not keep_checkpoint:
+        checkpoint.finish()
+    return report
+
+
+def remove_checkpoint(job_id: str, directory: str = None):
+    """Deletes a checkpoint kept with ingest_documents(..., keep_checkpoint=True)."""
+    path = os.path.join(directory or Config.INGEST_CHECKPOINT_DIR, f"{job_id}.json")
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,170 @@
+"""
+Bulk ingestion of a directory tree of PDF/TXT files.
+
+    python ingest_cli.py ./knowledge_base --workers 8
+
+Files are parsed and chunked in a process pool (same rules as the Streamlit app),
+while the main process streams the chunks into batched, checkpointed embedding
+and upsert rounds. Chunk IDs are deterministic, so re-running is idempotent.
+Parsed files are consumed in sorted path order and rounds are cut at file
+boundaries, so an interrupted run resumes from its checkpoints when re-run on
+the same files.
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from config import Config
+from utils import extract_pdf_pages, process_text_into_chunks
+from llm_router import estimate_tokens
+from ingest import ingest_documents, remove_checkpoint
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+
+def find_documents(root: str) -> list[str]:
+    """All supported files under root, in a stable order."""
+    paths = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(directory, name))
+    return sorted(paths)
+
+
+def parse_and_chunk(path: str, root: str):
+    """Worker: reads one file and splits it into chunks. Returns (path, docs, error)."""
+    source_name = os.path.relpath(path, root)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.lower().endswith(".pdf"):
+            text = "".join(extract_pdf_pages(data))
+        else:
+            text = data.decode("utf-8", errors="replace")
+        return path, process_text_into_chunks(text, source_name), None
+    except Exception as e:
+        return path, [], str(e)
+
+
+class Throughput:
+    """Running totals for the progress and summary lines."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.files = 0
+        self.failed = 0
+        self.chunks = 0
+        self.duplicates = 0
+        self.embed_chars = 0
+        self.skipped_chunks = 0
+
+    def line(self) -> str:
+        elapsed = max(time.time() - self.start, 1e-9)
+        return (
+            f"{self.files} files ({self.files / elapsed:.1f} files/s) | "
+            f"{self.chunks} chunks ({self.chunks / elapsed:.1f} chunks/s) | "
+            f"{estimate_tokens(self.embed_chars) / elapsed:.0f} embed tokens/s | "
+            f"{self.failed} failed | {self.duplicates} duplicates | {elapsed:.1f}s"
+        )
+
+
+def flush(vectorstore, buffer: list, stats: Throughput, batch_size: int, job_ids: list):
+    """
+    Embeds and upserts the buffered chunks in checkpointed batches. Checkpoints are
+    kept (ids appended to job_ids) until the whole run succeeds, so a re-run skips
+    every round that was already committed, not just the one that failed. A local
+    store is saved before each batch is checkpointed, so skipped rounds are on disk.
+    """
+    if not buffer:
+        return
+    report = ingest_documents(vectorstore, buffer, batch_size=batch_size, keep_checkpoint=True)
+    job_ids.append(report["job_id"])
+    stats.skipped_chunks += report["skipped_chunks"]
+    # Batches committed by an earlier run were not re-embedded
+    buffer_chars = sum(len(doc.page_content) for doc in buffer)
+    stats.embed_chars += buffer_chars * report["written_chunks"] // report["chunks"]
+    buffer.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of PDF/TXT files.")
+    parser.add_argument("directory", help="Root directory to walk")
+    parser.add_argument("--workers", type=int, default=Config.BULK_PARSE_WORKERS, help="Parser processes")
+    parser.add_argument("--batch-size", type=int, default=Config.INGEST_BATCH_SIZE, help="Chunks per upsert batch")
+    parser.add_argument("--flush-chunks", type=int, default=Config.BULK_FLUSH_CHUNKS, help="Chunks buffered per ingest round")
+    parser.add_argument("--no-dedup", action="store_true", help="Disable near-duplicate elimination")
+    args = parser.parse_args(argv)
+
+    missing_keys = Config.missing_keys()
+    if missing_keys:
+        sys.exit(f"Missing API Keys in .env: {', '.join(missing_keys)}")
+
+    paths = find_documents(args.directory)
+    if not paths:
+        sys.exit(f"No PDF/TXT files found under {args.directory}")
+    print(f"Found {len(paths)} files under {args.directory}")
+
+    # Imported late so the worker processes only load the parsing modules
+    from vector_store import initialize_vectorstore
+    from dedup import DEDUP_INDEX
+
+    vectorstore = initialize_vectorstore()
+    dedup = Config.DEDUP_ENABLED and not args.no_dedup
+    stats = Throughput()
+    buffer = []
+    job_ids = []
+    last_report = time.time()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Keep a bounded window of files in flight or waiting so parsed chunks never pile up in memory
+        in_flight = {}   # future -> index in paths
+        completed = {}   # index in paths -> result, held until every earlier file is consumed
+        submitted = 0
+        next_index = 0
+        window = args.workers * 4
+
+        while next_index < len(paths):
+            while submitted < len(paths) and len(in_flight) + len(completed) < window:
+                in_flight[pool.submit(parse_and_chunk, paths[submitted], args.directory)] = submitted
+                submitted += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                completed[in_flight.pop(future)] = future.result()
+
+            # Consume in path order and flush at file boundaries: the rounds, and so the
+            # checkpoint job IDs, are the same on every run over the same files
+            while next_index in completed:
+                path, docs, error = completed.pop(next_index)
+                next_index += 1
+                stats.files += 1
+                if error:
+                    stats.failed += 1
+                    print(f"  ! {path}: {error}")
+                    continue
+                if dedup and docs:
+                    docs, dedup_report = DEDUP_INDEX.filter(docs)
+                    stats.duplicates += dedup_report["removed"]
+                stats.chunks += len(docs)
+                buffer.extend(docs)
+
+                if len(buffer) >= args.flush_chunks:
+                    flush(vectorstore, buffer, stats, args.batch_size, job_ids)
+
+            if time.time() - last_report >= 5:
+                print(stats.line())
+                last_report = time.time()
+
+    # Every committed batch is already saved (local stores are written before each checkpoint)
+    flush(vectorstore, buffer, stats, args.batch_size, job_ids)
+    for job_id in job_ids:
+        remove_checkpoint(job_id)
+
+    print(stats.line())
+    print(f"Done. {stats.skipped_chunks} chunks were already committed by a previous run.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import itertools
+import numpy as np
+from config import Config
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+    """Index of the most similar centroid for each row, computed in memory-bounded batches."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch):
+        block = vectors[start:start + batch]
+        assignments[start:start + batch] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """K-means on unit vectors with cosine similarity; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=k)
+
+        # Re-seed empty clusters from random points so every list stays useful
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate index over the rows of a vector matrix.
+    Rows are bucketed under their nearest k-means centroid; a query scans only the
+    `nprobe` closest buckets. Raising nprobe trades latency for recall.
+    Supports incremental inserts, deletes (via row remapping) and save/load.
+    """
+
+    def __init__(self, nlist: int = None, nprobe: int = None):
+        self.nlist = nlist or Config.IVF_NLIST
+        self.nprobe = nprobe or Config.IVF_NPROBE
+        self.centroids = None
+        self.lists: list = []
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, matrix: np.ndarray):
+        """Fits centroids on a sample of `matrix` and assigns every row."""
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(matrix))))
+        nlist = min(nlist, len(matrix))
+
+        sample = matrix
+        if len(matrix) > Config.IVF_TRAIN_SAMPLE:
+            rows = np.random.default_rng(0).choice(len(matrix), Config.IVF_TRAIN_SAMPLE, replace=False)
+            sample = matrix[rows]
+
+        self.centroids = spherical_kmeans(sample, nlist, Config.IVF_KMEANS_ITERATIONS)
+        self.lists = [[] for _ in range(nlist)]
+        self.add(np.arange(len(matrix)), matrix)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Files new rows under their nearest centroid."""
+        if not self.trained or not len(rows):
+            return
+        for row, centroid in zip(rows.tolist(), nearest_centroids(vectors, self.centroids).tolist()):
+            self.lists[centroid].append(row)
+
+    def remap(self, mapping: np.ndarray):
+        """Applies a row renumbering after deletes; rows mapped to -1 are dropped."""
+        self.lists = [[int(mapping[r]) for r in bucket if mapping[r] >= 0] for bucket in self.lists]
+
+    def candidates(self, query: np.ndarray, nprobe: int = None) -> np.ndarray:
+        """Rows stored in the `nprobe` buckets closest to the query."""
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = itertools.chain.from_iterable(self.lists[c] for c in probe.tolist())
+        return np.fromiter(rows, dtype=np.int64)
+
+    def state(self) -> dict:
+        """Arrays describing the index, for np.savez."""
+        sizes = np.array([len(bucket) for bucket in self.lists], dtype=np.int64)
+        rows = np.fromiter(itertools.chain.from_iterable(self.lists), dtype=np.int64, count=int(sizes.sum()))
+        return {"ivf_centroids": self.centroids, "ivf_sizes": sizes, "ivf_rows": rows}
+
+    @classmethod
+    def from_state(cls, state, nprobe: int = None):
+        index = cls(nlist=len(state["ivf_centroids"]), nprobe=nprobe)
+        index.centroids = state["ivf_centroids"]
+        offsets = np.concatenate([[0], np.cumsum(state["ivf_sizes"])])
+        rows = state["ivf_rows"].tolist()
+        index.lists = [rows[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return index
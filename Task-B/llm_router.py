@@ -0,0 +1,79 @@
+import re
+import threading
+from config import Config
+
+# Question shapes that usually need multi-hop reasoning or synthesis
+COMPLEX_PATTERNS = re.compile(
+    r"\b(compare|comparison|contrast|differen\w*|versus|vs\.?|why|explain|"
+    r"summar\w*|analy\w*|evaluate|implication\w*|trade-?offs?|relationship|"
+    r"pros and cons|step by step|how does|how do|how would)\b",
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(chars: int) -> float:
+    """Rough token estimate (approx 4 chars per token)."""
+    return chars / 4
+
+
+def estimate_cost(model: str, chars: int) -> float:
+    """Prompt cost estimate in USD for a model, from Config pricing."""
+    price = Config.LLM_PRICING_PER_1K_TOKENS.get(
+        model, Config.LLM_PRICING_PER_1K_TOKENS[Config.LLM_MODEL]
+    )
+    return (estimate_tokens(chars) / 1000) * price
+
+
+def route_query(question: str, context_chars: int, confidence: float) -> dict:
+    """
+    Classifies a query with cheap local heuristics and picks a model tier.
+    Anything that looks like synthesis, carries a large context or comes with
+    weak retrieval confidence goes to the strong tier; the rest goes to the fast one.
+    """
+    if not Config.LLM_ROUTING:
+        return {"tier": "default", "model": Config.LLM_MODEL, "reasons": []}
+
+    reasons = []
+    if COMPLEX_PATTERNS.search(question):
+        reasons.append("complex_question")
+    if question.count("?") > 1:
+        reasons.append("multiple_questions")
+    if len(question.split()) > Config.ROUTER_MAX_FAST_QUESTION_WORDS:
+        reasons.append("long_question")
+    if estimate_tokens(context_chars) > Config.ROUTER_MAX_FAST_CONTEXT_TOKENS:
+        reasons.append("large_context")
+    if confidence is not None and confidence < Config.ROUTER_MIN_FAST_CONFIDENCE:
+        reasons.append("low_confidence")
+
+    if reasons:
+        return {"tier": "strong", "model": Config.LLM_STRONG_MODEL, "reasons": reasons}
+    return {"tier": "fast", "model": Config.LLM_FAST_MODEL, "reasons": []}
+
+
+class RouterStats:
+    """Process-wide per-tier request counts, generation latency and cost."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tiers: dict = {}
+
+    def record(self, tier: str, latency: float, cost: float):
+        with self._lock:
+            stats = self.tiers.setdefault(tier, {"requests": 0, "latency": 0.0, "cost": 0.0})
+            stats["requests"] += 1
+            stats["latency"] += latency
+            stats["cost"] += cost
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                tier: {
+                    "requests": s["requests"],
+                    "avg_latency": round(s["latency"] / s["requests"], 3),
+                    "total_cost": f"${s['cost']:.6f}",
+                }
+                for tier, s in self.tiers.items()
+            }
+
+
+ROUTER_STATS = RouterStats()
@@ -0,0 +1,304 @@
+"""
+Concurrency soak/load test for the RAG query path.
+
+    python load_test.py --users 100 --qps 5,10,20,40 --duration 30 --report load.json
+    python load_test.py --providers cassette --questions questions.txt --users 50 --qps 10
+
+Questions are replayed against RAGEngine.query at each target QPS step (open loop:
+arrivals follow the schedule whatever the latency, and latency is measured from the
+scheduled arrival, so client-side queueing is counted). At most --users requests are
+in flight. Providers:
+- synthetic: local stand-ins for Gemini, Cohere and the vector store, with the
+  per-provider latencies of Config.CASSETTE_SYNTHETIC_LATENCY (no keys, no network)
+- cassette:  replay of a recorded cassette (CASSETTE_PATH)
+- live:      the configured providers
+The JSON report has throughput, latency percentiles, errors and the saturation point
+(the first step that cannot sustain its target QPS, breaks the --slo p95 latency
+or fails more than 1% of requests).
+"""
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import Config
+
+DEFAULT_QUESTIONS = [
+    "What is the main topic of the document?",
+    "Summarize the key findings about revenue growth.",
+    "Who are the authors mentioned in the report?",
+    "What risks are described for the next quarter?",
+    "How does the proposed method compare to the baseline?",
+    "What are the limitations of the approach?",
+    "Which datasets were used in the evaluation?",
+    "Explain the architecture of the system.",
+]
+
+
+# --- Synthetic stand-ins ---
+
+def _jittered_sleep(seconds: float):
+    time.sleep(seconds * random.uniform(0.5, 1.5))
+
+
+def _hashed_vector(text: str) -> list[float]:
+    """Deterministic bag-of-words vector, so retrieval still favours word overlap."""
+    vector = np.zeros(Config.EMBEDDING_DIMENSION, dtype=np.float32)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % len(vector)] += 1.0
+    vector += 1e-3
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def _overlap(query: str, text: str) -> float:
+    query_words = set(query.lower().split())
+    return len(query_words & set(text.lower().split())) / max(len(query_words), 1)
+
+
+class SyntheticEmbeddings:
+    def embed_query(self, text: str) -> list[float]:
+        _jittered_sleep(Config.CASSETTE_SYNTHETIC_LATENCY["embed"])
+        return _hashed_vector(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        _jittered_sleep(Config.CASSETTE_SYNTHETIC_LATENCY["embed"])
+        return [_hashed_vector(text) for text in texts]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+
+class SyntheticReranker:
+    def rerank(self, documents, query: str, top_n: int = -1, **kwargs):
+        _jittered_sleep(Config.CASSETTE_SYNTHETIC_LATENCY["rerank"])
+        scored = sorted(
+            ({"index": i, "relevance_score": _overlap(query, doc)} for i, doc in enumerate(documents)),
+            key=lambda r: r["relevance_score"],
+            reverse=True
+        )
+        return scored[:top_n] if top_n and top_n > 0 else scored
+
+
+def synthetic_chat_model(model: str):
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    def respond(prompt):
+        text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+        # Latency grows with prompt size, like a real completion
+        _jittered_sleep(Config.CASSETTE_SYNTHETIC_LATENCY["chat"] * (0.5 + len(text) / 8000))
+        return AIMessage(content=f"[{model}] Synthetic answer based on [1].")
+
+    return RunnableLambda(respond)
+
+
+class SyntheticVectorStore:
+    """LocalVectorStore filled with a synthetic corpus; searches pay the synthetic vector latency."""
+
+    def __init__(self, chunks: int, questions: list[str]):
+        from local_store import LocalVectorStore
+        self.store = LocalVectorStore(SyntheticEmbeddings())
+        vocabulary = sorted({w for q in questions for w in q.lower().strip("?.").split()}) + \
+            [f"term{i}" for i in range(500)]
+        rng = random.Random(0)
+        texts = [" ".join(rng.choices(vocabulary, k=80)) for _ in range(chunks)]
+        self.store.add_vectors(
+            [_hashed_vector(t) for t in texts],
+            texts,
+            [{"source": f"synthetic-{i // 50}.txt", "chunk_id": i % 50} for i in range(chunks)],
+            [f"synthetic-{i}" for i in range(chunks)]
+        )
+
+    @property
+    def embeddings(self):
+        return self.store.embeddings
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        embedding = self.store.embeddings.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        _jittered_sleep(Config.CASSETTE_SYNTHETIC_LATENCY["vector"])
+        return self.store.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+
+def build_engine(providers: str, chunks: int, questions: list[str]):
+    from rag_engine import RAGEngine
+    if providers == "synthetic":
+        return RAGEngine(
+            SyntheticVectorStore(chunks, questions),
+            chat_model_factory=synthetic_chat_model,
+            reranker=SyntheticReranker()
+        )
+
+    from vector_store import initialize_vectorstore
+    return RAGEngine(initialize_vectorstore())
+
+
+# --- Load generation ---
+
+def percentiles(latencies: list[float]) -> dict:
+    if not latencies:
+        return {}
+    values = np.percentile(latencies, [50, 90, 95, 99])
+    return {
+        "p50": round(float(values[0]), 3),
+        "p90": round(float(values[1]), 3),
+        "p95": round(float(values[2]), 3),
+        "p99": round(float(values[3]), 3),
+        "max": round(max(latencies), 3),
+        "mean": round(sum(latencies) / len(latencies), 3),
+    }
+
+
+def run_step(engine, questions: list[str], qps: float, duration: float, users: int,
+             use_executor: bool, timeout: float) -> dict:
+    """Offers qps requests per second for `duration` seconds with at most `users` in flight."""
+    from work_executor import WORK_EXECUTOR, Saturated
+
+    lock = threading.Lock()
+    latencies, errors = [], {}
+    in_flight = threading.BoundedSemaphore(users)
+    peak = {"in_flight": 0, "current": 0}
+
+    def request(question: str, scheduled_at: float):
+        with lock:
+            peak["current"] += 1
+            peak["in_flight"] = max(peak["in_flight"], peak["current"])
+        try:
+            if use_executor:
+                WORK_EXECUTOR.submit("query", engine.query, question).result(timeout=timeout)
+            else:
+                engine.query(question)
+            with lock:
+                latencies.append(time.monotonic() - scheduled_at)
+        except Exception as e:
+            name = "Saturated" if isinstance(e, Saturated) else type(e).__name__
+            with lock:
+                errors[name] = errors.get(name, 0) + 1
+        finally:
+            with lock:
+                peak["current"] -= 1
+            in_flight.release()
+
+    total = int(qps * duration)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="load-user") as pool:
+        for i in range(total):
+            scheduled_at = start + i / qps
+            delay = scheduled_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # All users busy: the arrival waits here, and that wait counts towards its latency
+            in_flight.acquire()
+            pool.submit(request, random.choice(questions), scheduled_at)
+        # Falls behind the schedule once every user is busy
+        dispatch_elapsed = max(time.monotonic() - start, duration)
+    elapsed = time.monotonic() - start
+
+    failed = sum(errors.values())
+    return {
+        "target_qps": qps,
+        "offered": total,
+        "completed": len(latencies),
+        "failed": failed,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "errors": errors,
+        "dispatched_qps": round(total / dispatch_elapsed, 2),
+        "throughput_qps": round(len(latencies) / elapsed, 2),
+        "elapsed": round(elapsed, 2),
+        "peak_in_flight": peak["in_flight"],
+        "latency": percentiles(latencies),
+    }
+
+
+def saturation_point(steps: list[dict], slo_p95: float):
+    """First step that cannot keep up with 90% of its target QPS, breaks the p95 SLO or errors > 1%."""
+    for step in steps:
+        p95 = step["latency"].get("p95", float("inf"))
+        if step["dispatched_qps"] < 0.9 * step["target_qps"] or p95 > slo_p95 or step["error_rate"] > 0.01:
+            return step["target_qps"]
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the RAG query path.")
+    parser.add_argument("--providers", choices=["synthetic", "cassette", "live"], default="synthetic")
+    parser.add_argument("--users", type=int, default=100, help="Max concurrent requests (50-200 typical)")
+    parser.add_argument("--qps", default="5,10,20", help="Comma-separated target QPS steps")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per step")
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic corpus size")
+    parser.add_argument("--slo", type=float, default=5.0, help="p95 latency objective in seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--executor", action="store_true", help="Go through the shared work executor like the UI")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the rerank score cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    if args.providers == "cassette":
+        Config.CASSETTE_MODE = "replay"
+    if args.no_cache:
+        Config.RERANK_CACHE_ENABLED = False
+    if args.providers == "live":
+        missing_keys = Config.missing_keys()
+        if missing_keys:
+            sys.exit(f"Missing API Keys in .env: {', '.join(missing_keys)}")
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    from rerank_policy import RERANK_STATS, RERANK_CACHE
+    from llm_router import ROUTER_STATS
+    from work_executor import WORK_EXECUTOR
+
+    engine = build_engine(args.providers, args.chunks, questions)
+    steps = []
+    for qps in [float(q) for q in args.qps.split(",")]:
+        print(f"Step: {qps:g} QPS for {args.duration:g}s, {args.users} users...", flush=True)
+        step = run_step(engine, questions, qps, args.duration, args.users, args.executor, args.timeout)
+        steps.append(step)
+        latency = step["latency"]
+        print(
+            f"  {step['throughput_qps']} QPS | p50 {latency.get('p50')}s p95 {latency.get('p95')}s "
+            f"p99 {latency.get('p99')}s | errors {step['error_rate']:.1%} | peak in flight {step['peak_in_flight']}"
+        )
+
+    report = {
+        "config": {
+            "providers": args.providers,
+            "users": args.users,
+            "duration": args.duration,
+            "slo_p95": args.slo,
+            "executor": args.executor,
+            "rerank_cache": Config.RERANK_CACHE_ENABLED,
+            "questions": len(questions),
+            "synthetic_latency": Config.CASSETTE_SYNTHETIC_LATENCY,
+        },
+        "steps": steps,
+        "saturation_qps": saturation_point(steps, args.slo),
+        "rerank": RERANK_STATS.snapshot(),
+        "rerank_cache": RERANK_CACHE.snapshot(),
+        "router": ROUTER_STATS.snapshot(),
+        "executor": WORK_EXECUTOR.stats(),
+    }
+    print(f"Saturation point: {report['saturation_qps'] or 'not reached'}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
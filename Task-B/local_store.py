@@ -0,0 +1,428 @@
+import os
+import json
+import time
+import uuid
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from config import Config
+from ivf_index import IVFIndex
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalizes each row so that dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def matches_filter(metadata: dict, filter: dict) -> bool:
+    """Evaluates the subset of Pinecone filter syntax used by the app ($eq / $in / plain values)."""
+    for field, condition in filter.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class DimensionReducer:
+    """
+    Maps full-width embeddings to a smaller search dimension.
+    - "truncate": keep the first `dim` components and renormalize (Matryoshka-style prefix).
+    - "pca": project onto the top `dim` principal components fitted at index time.
+    """
+
+    def __init__(self, dim: int, method: str = "truncate"):
+        if method not in ("truncate", "pca"):
+            raise ValueError(f"Unknown reduction method: {method}")
+        self.dim = dim
+        self.method = method
+        self.mean = None
+        self.components = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.method == "truncate" or self.components is not None
+
+    def fit(self, vectors: np.ndarray, max_samples: int = 20000):
+        if self.method != "pca":
+            return self
+        if len(vectors) > max_samples:
+            rows = np.random.default_rng(0).choice(len(vectors), max_samples, replace=False)
+            vectors = vectors[rows]
+        self.mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.components = vt[:self.dim].T.astype(np.float32)
+        return self
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        if self.method == "truncate":
+            return normalize_rows(vectors[:, :self.dim])
+        return normalize_rows((vectors - self.mean) @ self.components)
+
+
+class RowBuffer:
+    """Growable float32 matrix with amortized O(1) row appends (capacity doubling)."""
+
+    def __init__(self, width: int):
+        self._data = np.zeros((0, width), dtype=np.float32)
+        self.size = 0
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._data[:self.size]
+
+    def append(self, rows: np.ndarray):
+        needed = self.size + len(rows)
+        if needed > len(self._data):
+            grown = np.zeros((max(needed, 2 * len(self._data), 1024), self._data.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.array
+            self._data = grown
+        self._data[self.size:needed] = rows
+        self.size = needed
+
+    def set_row(self, position: int, row: np.ndarray):
+        self._data[position] = row
+
+    def keep(self, rows: np.ndarray):
+        kept = self._data[rows]
+        self._data = kept
+        self.size = len(kept)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store with cosine search over numpy arrays.
+    Search runs in up to two stages:
+    - Shortlist: scan the reduced-dimension matrix (LOCAL_REDUCED_DIMENSION) and,
+      with LOCAL_INDEX="ivf", only the rows in the nprobe nearest IVF buckets.
+    - Rescore: score the shortlist at full width.
+    Without reduction or an index the search is exact.
+    """
+
+    def __init__(self, embedding, reduced_dim: int = None, reduction: str = None,
+                 shortlist_k: int = None, index: str = None, path: str = None):
+        self._embedding = embedding
+        self._lock = threading.RLock()
+        self.path = path
+
+        reduced_dim = Config.LOCAL_REDUCED_DIMENSION if reduced_dim is None else reduced_dim
+        self.reducer = None
+        self._reduced = None
+        if reduced_dim and reduced_dim < Config.EMBEDDING_DIMENSION:
+            self.reducer = DimensionReducer(reduced_dim, reduction or Config.LOCAL_REDUCTION)
+            self._reduced = RowBuffer(reduced_dim)
+        self.shortlist_k = shortlist_k or Config.LOCAL_SHORTLIST_K
+        self.index = IVFIndex() if (index or Config.LOCAL_INDEX) == "ivf" else None
+
+        self.ids: list[str] = []
+        self.texts: list[str] = []
+        self.metadatas: list[dict] = []
+        self.positions: dict = {}
+        self._vectors = RowBuffer(Config.EMBEDDING_DIMENSION)
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors.array
+
+    @property
+    def reduced(self):
+        """Reduced-dimension matrix, or None until the reducer is usable."""
+        if self.reducer is None or not self.reducer.fitted or not self.ids:
+            return None
+        return self._reduced.array
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Writes ---
+
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None) -> list[str]:
+        """
+        Upserts precomputed vectors. Existing IDs are overwritten in place
+        (an updated row keeps its IVF bucket until the next rebuild()).
+        """
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+
+        with self._lock:
+            new_rows = []
+            for vector, text, metadata, doc_id in zip(vectors, texts, metadatas, ids):
+                position = self.positions.get(doc_id)
+                if position is not None:
+                    self._vectors.set_row(position, vector)
+                    if self.reduced is not None:
+                        self._reduced.set_row(position, self.reducer.transform(vector[None, :])[0])
+                    self.texts[position] = text
+                    self.metadatas[position] = metadata
+                    continue
+                self.positions[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+                self.texts.append(text)
+                self.metadatas.append(metadata)
+                new_rows.append(vector)
+
+            if new_rows:
+                start = self._vectors.size
+                self._vectors.append(np.stack(new_rows))
+                self._index_new_rows(start)
+        return list(ids)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs) -> list[str]:
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def _index_new_rows(self, start: int):
+        """Projects and files rows [start:] incrementally; fits PCA / trains IVF once there is enough data."""
+        refit = False
+        if self.reducer is not None:
+            if self.reducer.fitted:
+                self._reduced.append(self.reducer.transform(self.vectors[start:]))
+            elif len(self.ids) >= Config.LOCAL_PCA_MIN_SAMPLES:
+                self.reducer.fit(self.vectors)
+                self._reduced = RowBuffer(self.reducer.dim)
+                self._reduced.append(self.reducer.transform(self.vectors))
+                refit = True
+
+        if self.index is None:
+            return
+        space = self._search_space()
+        if self.index.trained and not refit:
+            self.index.add(np.arange(start, len(self.ids)), space[start:])
+        elif len(self.ids) >= Config.IVF_TRAIN_MIN:
+            self.index.train(space)
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        with self._lock:
+            drop = {self.positions[i] for i in ids if i in self.positions}
+            if not drop:
+                return False
+            keep = np.array([p for p in range(len(self.ids)) if p not in drop], dtype=np.int64)
+            mapping = np.full(len(self.ids), -1, dtype=np.int64)
+            mapping[keep] = np.arange(len(keep))
+
+            self.ids = [self.ids[p] for p in keep]
+            self.texts = [self.texts[p] for p in keep]
+            self.metadatas = [self.metadatas[p] for p in keep]
+            self.positions = {doc_id: p for p, doc_id in enumerate(self.ids)}
+            self._vectors.keep(keep)
+            if self._reduced is not None and self._reduced.size:
+                self._reduced.keep(keep)
+            if self.index is not None and self.index.trained:
+                self.index.remap(mapping)
+        return True
+
+    def rebuild(self):
+        """Refits the reducer and retrains the IVF index on the current data."""
+        with self._lock:
+            if self.reducer is not None and self.reducer.method == "pca":
+                self.reducer.components = None
+            if self.reducer is not None:
+                self._reduced = RowBuffer(self.reducer.dim)
+            if self.index is not None:
+                self.index = IVFIndex(nprobe=self.index.nprobe)
+            if self.ids:
+                self._index_new_rows(0)
+
+    # --- Search ---
+
+    def _search_space(self) -> np.ndarray:
+        """Matrix scanned by the shortlist stage."""
+        reduced = self.reduced
+        return reduced if reduced is not None else self.vectors
+
+    def _candidate_mask(self, filter: dict = None):
+        if not filter:
+            return None
+        return np.fromiter(
+            (matches_filter(m, filter) for m in self.metadatas), dtype=bool, count=len(self.ids)
+        )
+
+    def _search_exact(self, query: np.ndarray, k: int, mask=None):
+        scores = self.vectors @ query
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        return self._top_k(scores, k)
+
+    def _search_two_stage(self, query: np.ndarray, k: int, mask=None, nprobe: int = None):
+        reduced = self.reduced
+        use_index = self.index is not None and self.index.trained
+        if reduced is None and not use_index:
+            return self._search_exact(query, k, mask)
+
+        # 1. Shortlist (reduced dimension and/or IVF buckets)
+        space = self._search_space()
+        search_query = self.reducer.transform(query[None, :])[0] if reduced is not None else query
+        if use_index:
+            rows = self.index.candidates(search_query, nprobe)
+            if mask is not None:
+                rows = rows[mask[rows]]
+            low_scores = space[rows] @ search_query
+        else:
+            rows = np.arange(len(self.ids))
+            low_scores = space @ search_query
+            if mask is not None:
+                low_scores = np.where(mask, low_scores, -np.inf)
+        top, _ = self._top_k(low_scores, max(k, self.shortlist_k))
+        shortlist = rows[top]
+
+        # 2. Rescore the shortlist at full width
+        full_scores = self.vectors[shortlist] @ query
+        order = np.argsort(-full_scores)[:k]
+        return shortlist[order], full_scores[order]
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int):
+        k = min(k, len(scores))
+        if k == 0:
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+        return top, scores[top]
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        query = normalize_rows(np.asarray([embedding], dtype=np.float32))[0]
+        with self._lock:
+            if not self.ids:
+                return []
+            rows, scores = self._search_two_stage(query, k, self._candidate_mask(filter))
+            return [
+                (Document(page_content=self.texts[r], metadata=dict(self.metadatas[r]), id=self.ids[r]), float(s))
+                for r, s in zip(rows, scores)
+            ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    # --- Persistence ---
+
+    def save(self, path: str = None):
+        """Writes vectors, texts, metadata, the fitted reducer and the IVF index to one .npz file."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the local vector store")
+
+        with self._lock:
+            state = {
+                "vectors": self.vectors,
+                "ids": np.array(self.ids, dtype=str),
+                "texts": np.array(json.dumps(self.texts)),
+                "metadatas": np.array(json.dumps(self.metadatas)),
+            }
+            if self.reducer is not None:
+                state["reducer_dim"] = np.array(self.reducer.dim)
+                state["reducer_method"] = np.array(self.reducer.method)
+                if self.reducer.components is not None:
+                    state["reducer_mean"] = self.reducer.mean
+                    state["reducer_components"] = self.reducer.components
+            if self.index is not None and self.index.trained:
+                state.update(self.index.state())
+
+            # Write then rename so a crash never leaves a truncated store behind
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **state)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, embedding):
+        with np.load(path, allow_pickle=False) as data:
+            state = {key: data[key] for key in data.files}
+
+        kwargs = {"path": path}
+        if "reducer_dim" in state:
+            kwargs.update(reduced_dim=int(state["reducer_dim"]), reduction=str(state["reducer_method"]))
+        if "ivf_centroids" in state:
+            kwargs["index"] = "ivf"
+        store = cls(embedding, **kwargs)
+
+        store.ids = state["ids"].tolist()
+        store.texts = json.loads(str(state["texts"]))
+        store.metadatas = json.loads(str(state["metadatas"]))
+        store.positions = {doc_id: p for p, doc_id in enumerate(store.ids)}
+        store._vectors.append(state["vectors"])
+
+        if "ivf_centroids" not in state:
+            # Fits/trains as if the rows had just been inserted
+            if store.reducer is not None and "reducer_components" in state:
+                store.reducer.mean = state["reducer_mean"]
+                store.reducer.components = state["reducer_components"]
+            store._index_new_rows(0)
+            return store
+
+        if store.reducer is not None:
+            if "reducer_components" in state:
+                store.reducer.mean = state["reducer_mean"]
+                store.reducer.components = state["reducer_components"]
+            if store.reducer.fitted:
+                store._reduced.append(store.reducer.transform(store.vectors))
+        store.index = IVFIndex.from_state(state)
+        return store
+
+    # --- Reporting ---
+
+    def recall_report(self, k: int = 10, sample: int = 100, queries=None, nprobe: int = None) -> dict:
+        """
+        Compares the shortlist + rescore search (reduced dimension and/or IVF)
+        against exact full-dimension search. Uses stored vectors as queries unless
+        `queries` (raw embeddings) are given; `nprobe` overrides the IVF setting.
+        """
+        with self._lock:
+            if not self.ids:
+                return {}
+            if queries is None:
+                rng = np.random.default_rng(0)
+                rows = rng.choice(len(self.ids), min(sample, len(self.ids)), replace=False)
+                queries = self.vectors[rows]
+            queries = normalize_rows(np.asarray(queries, dtype=np.float32))
+
+            exact_time, reduced_time, hits = 0.0, 0.0, 0
+            for query in queries:
+                start = time.perf_counter()
+                exact, _ = self._search_exact(query, k)
+                exact_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                approx, _ = self._search_two_stage(query, k, nprobe=nprobe)
+                reduced_time += time.perf_counter() - start
+
+                hits += len(set(exact.tolist()) & set(approx.tolist()))
+
+            n = len(queries)
+            return {
+                "vectors": len(self.ids),
+                "full_dimension": self.vectors.shape[1],
+                "search_dimension": self.reduced.shape[1] if self.reduced is not None else self.vectors.shape[1],
+                "reduction": self.reducer.method if self.reducer else None,
+                "index": "ivf" if self.index is not None and self.index.trained else "flat",
+                "nprobe": (nprobe or self.index.nprobe) if self.index is not None and self.index.trained else None,
+                f"recall@{k}": round(hits / (n * min(k, len(self.ids))), 4),
+                "exact_ms": round(exact_time / n * 1000, 3),
+                "two_stage_ms": round(reduced_time / n * 1000, 3),
+                "scan_bytes_full": int(self.vectors.nbytes),
+                "scan_bytes_reduced": int(self.reduced.nbytes) if self.reduced is not None else int(self.vectors.nbytes),
+            }
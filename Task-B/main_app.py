@@ -1,8 +1,14 @@
+import time
 import streamlit as st
 from config import Config
 from utils import process_text_into_chunks, get_pdf_text
 from vector_store import initialize_vectorstore
-from rag_engine import RAGEngine
+from rag_engine import RAGEngine, build_chat_model
+from summarizer import is_summary_request
+from dedup import DEDUP_INDEX
+from ingest import ingest_documents
+from memory import ConversationMemory
+from work_executor import WORK_EXECUTOR, Saturated
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -354,15 +360,59 @@ st.markdown("""
 # --- INITIALIZATION ---
 Config.validate_keys()
 
+
+def await_future(future, progress_bar=None, progress_state=None):
+    """Waits for work running on the shared executor, updating a progress bar from a worker-side dict."""
+    while not future.done():
+        if progress_bar is not None and progress_state.get("total"):
+            progress_bar.progress(progress_state["done"] / progress_state["total"])
+        time.sleep(0.1)
+    return future.result()
+
+
+def index_source(vectorstore, raw_text, source_name, progress_state):
+    """Chunks, deduplicates and ingests one source. Runs on the shared executor."""
+    # 1. Chunk and Process
+    docs = process_text_into_chunks(raw_text, source_name)
+
+    # 2. Drop near-duplicate chunks (boilerplate, repeated legal text)
+    dedup_report = None
+    if Config.DEDUP_ENABLED:
+        docs, dedup_report = DEDUP_INDEX.filter(docs)
+
+    # 3. Add to Vector Store (checkpointed, resumes after a failure)
+    ingest_report = None
+    if docs:
+        ingest_report = ingest_documents(
+            vectorstore,
+            docs,
+            progress=lambda done, total: progress_state.update(done=done, total=total)
+        )
+    return docs, dedup_report, ingest_report
+
+
+@st.cache_resource(show_spinner=False)
+def shared_vectorstore():
+    """
+    One vector store per process, shared by every session. A per-session local store
+    would save over the ingests of the other sessions; the store locks its own adds and saves.
+    """
+    return initialize_vectorstore()
+
+
 # Initialize Session State
 if "vectorstore" not in st.session_state:
     with st.spinner("🔮 Connecting to Vector Database..."):
-        st.session_state.vectorstore = initialize_vectorstore()
+        st.session_state.vectorstore = shared_vectorstore()
 
 # Track what is currently indexed
 if "current_source" not in st.session_state:
     st.session_state.current_source = "Empty"
 
+# Bounded conversation memory for follow-up questions
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory(build_chat_model(Config.MEMORY_MODEL))
+
 # --- SIDEBAR: INPUT ---
 with st.sidebar:
     st.markdown("## 📂 Source Material")
@@ -398,6 +448,17 @@ with st.sidebar:
             else:
                 raw_text = uploaded_file.read().decode("utf-8")
     
+    # Answer mode
+    st.markdown("---")
+    retrieval_only = st.toggle(
+        "🔎 Snippets only",
+        value=False,
+        help="Return the top matching passages without generating an answer"
+    )
+    skip_rerank = retrieval_only and st.checkbox("⚡ Skip reranking", value=False)
+    if st.button("🧹 Clear conversation", use_container_width=True):
+        st.session_state.memory.clear()
+
     # Sidebar info
     st.markdown("---")
     st.markdown("### 💡 How It Works")
@@ -411,16 +472,34 @@ with st.sidebar:
 if raw_text and source_name and source_name != st.session_state.current_source:
     with st.spinner(f"⚡ Processing '{source_name}'..."):
         try:
-            # 1. Chunk and Process
-            docs = process_text_into_chunks(raw_text, source_name)
-            
-            # 2. Add to Vector Store
-            st.session_state.vectorstore.add_documents(docs)
+            # 1-3. Chunk, deduplicate and ingest on the shared executor
+            progress_state = {"done": 0, "total": 0}
+            progress_bar = st.progress(0.0)
+            future = WORK_EXECUTOR.submit(
+                "ingest", index_source, st.session_state.vectorstore, raw_text, source_name, progress_state
+            )
+            docs, dedup_report, ingest_report = await_future(future, progress_bar, progress_state)
+            progress_bar.empty()
+            if ingest_report and ingest_report["resumed"]:
+                st.toast(
+                    f"↩️ Resumed ingestion: skipped {ingest_report['skipped_chunks']} committed chunks, "
+                    f"wrote {ingest_report['written_chunks']}",
+                    icon="↩️"
+                )
             
-            # 3. Update State
+            # 4. Update State
             st.session_state.current_source = source_name
+            st.session_state.memory.clear()
             st.toast(f"✅ Successfully indexed {len(docs)} chunks!", icon="✅")
+            if dedup_report and dedup_report["removed"]:
+                st.toast(
+                    f"🧹 Skipped {dedup_report['removed']} near-duplicate chunks "
+                    f"({dedup_report['removed_ratio']:.0%})",
+                    icon="🧹"
+                )
             
+        except Saturated as e:
+            st.warning(f"⏳ {e}")
         except Exception as e:
             st.error(f"❌ Indexing failed: {e}")
 
@@ -447,7 +526,7 @@ with col1:
 st.markdown("---")
 
 # Chat Interface
-query = st.chat_input("💬 Ask anything about your documents...")
+query = st.chat_input("💬 Ask anything about your documents, or /summarize the whole document...")
 
 if query:
     if st.session_state.current_source == "Empty":
@@ -459,13 +538,40 @@ if query:
 
         # Process Query
         with st.chat_message("assistant", avatar="🤖"):
-            with st.spinner("🔍 Searching knowledge base..."):
+            queue_wait = WORK_EXECUTOR.wait_estimate("query")
+            spinner_text = "🔍 Searching knowledge base..."
+            if queue_wait:
+                spinner_text = f"⏳ Busy, queued for ~{queue_wait}s, then searching..."
+            with st.spinner(spinner_text):
                 try:
+                    # The pipeline runs on the shared executor; this script thread only waits
                     engine = RAGEngine(st.session_state.vectorstore)
-                    result = engine.query(query)
+                    if retrieval_only:
+                        future = WORK_EXECUTOR.submit(
+                            "query", engine.search, query, k=Config.SEARCH_DEFAULT_K, rerank=not skip_rerank
+                        )
+                    elif is_summary_request(query):
+                        future = WORK_EXECUTOR.submit("summary", engine.summarize, st.session_state.current_source)
+                    else:
+                        future = WORK_EXECUTOR.submit("query", engine.query, query, memory=st.session_state.memory)
+                    result = await_future(future)
                     
-                    if result:
+                    if result and retrieval_only:
+                        for i, hit in enumerate(result["results"]):
+                            score = hit["rerank_score"] if hit["rerank_score"] is not None else hit["dense_score"]
+                            score_label = f" · score `{score:.3f}`" if score is not None else ""
+                            st.markdown(f"**[{i+1}] {hit['source']}**{score_label}")
+                            st.markdown(f"> {hit['text']}")
+                            if i < len(result["results"]) - 1:
+                                st.divider()
+                        st.caption(f"⏱️ Response Time: **{result['metrics']['latency']}s**")
+
+                    elif result:
                         st.markdown(result["answer"])
+                        st.session_state.memory.add_turn(query, result["answer"])
+                        standalone_query = result["metrics"].get("memory", {}).get("standalone_query")
+                        if standalone_query:
+                            st.caption(f"🔁 Searched as: *{standalone_query}*")
                         
                         # Metrics Footer
                         col1, col2, col3 = st.columns([2, 2, 3])
@@ -486,6 +592,8 @@ if query:
                     else:
                         st.warning("🔍 No relevant information found in the knowledge base.")
                         
+                except Saturated as e:
+                    st.warning(f"⏳ {e}")
                 except Exception as e:
                     st.error(f"❌ An error occurred: {str(e)}")
 
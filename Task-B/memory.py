@@ -0,0 +1,171 @@
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.prompts import ChatPromptTemplate
+from config import Config
+
+# Summary updates run off the request path; each is a single short call
+_MEMORY_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory")
+
+# Questions that lean on earlier turns ("what about it?", "and the second one?")
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|they|them|their|this|that|these|those|he|she|his|her|him|"
+    r"above|previous|earlier|former|latter|same|more|else|also|another|other|"
+    r"instead|then|why|how about|what about)\b",
+    re.IGNORECASE
+)
+
+CONDENSE_TEMPLATE = """
+Given the conversation below and a follow-up question, rewrite the follow-up question
+as a single standalone question that can be understood without the conversation.
+Keep names, numbers and technical terms. Return only the rewritten question.
+
+Conversation:
+{history}
+
+Follow-up question: {question}
+"""
+
+SUMMARY_TEMPLATE = """
+Update the running summary of a conversation with the new turns below.
+Keep the topics, entities and facts the user asked about or was told, so that later
+questions can refer back to them. Answer in at most {max_chars} characters.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+"""
+
+
+def _clip(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "…"
+
+
+def format_turns(turns) -> str:
+    """Renders (question, answer) pairs with each message clipped to MEMORY_TURN_MAX_CHARS."""
+    return "\n".join(
+        f"User: {_clip(question, Config.MEMORY_TURN_MAX_CHARS)}\n"
+        f"Assistant: {_clip(answer, Config.MEMORY_TURN_MAX_CHARS)}"
+        for question, answer in turns
+    )
+
+
+class ConversationMemory:
+    """
+    Bounded chat memory for one session.
+    The last MEMORY_RECENT_TURNS turns are kept verbatim; older turns are folded
+    into a running summary by a background LLM call, so adding a turn never waits
+    on the model. Everything rendered into a prompt is clipped, so the history
+    part of the prompt stays bounded however long the conversation gets.
+    """
+
+    def __init__(self, llm, recent_turns: int = None):
+        self.llm = llm
+        self.recent_turns = recent_turns or Config.MEMORY_RECENT_TURNS
+        self._lock = threading.Lock()
+        self._turns: deque = deque()
+        self._pending: list = []       # evicted turns waiting to be folded into the summary
+        self._folding = False
+        self.summary = ""
+        self.total_turns = 0
+        self.summary_updates = 0
+        self._epoch = 0                # bumped by clear() so an in-flight fold is discarded
+
+    def has_history(self) -> bool:
+        with self._lock:
+            return bool(self._turns or self._pending or self.summary)
+
+    def add_turn(self, question: str, answer: str):
+        """Records a finished turn; overflowing turns are summarized in the background."""
+        with self._lock:
+            self._turns.append((question, answer))
+            self.total_turns += 1
+            while len(self._turns) > self.recent_turns:
+                self._pending.append(self._turns.popleft())
+            start_fold = bool(self._pending) and not self._folding
+            if start_fold:
+                # If summarizing keeps failing, drop the oldest unsummarized turns
+                del self._pending[:-2 * self.recent_turns]
+                self._folding = True
+        if start_fold:
+            _MEMORY_EXECUTOR.submit(self._fold)
+
+    def _fold(self):
+        """Merges pending turns into the summary until none are left."""
+        while True:
+            with self._lock:
+                turns, summary, epoch = list(self._pending), self.summary, self._epoch
+                if not turns:
+                    self._folding = False
+                    return
+
+            chain = ChatPromptTemplate.from_template(SUMMARY_TEMPLATE) | self.llm
+            try:
+                updated = chain.invoke({
+                    "summary": summary or "(empty)",
+                    "turns": format_turns(turns),
+                    "max_chars": Config.MEMORY_SUMMARY_MAX_CHARS,
+                }).content
+            except Exception:
+                # Keep the turns pending; the next add_turn retries
+                with self._lock:
+                    self._folding = False
+                return
+
+            with self._lock:
+                if epoch != self._epoch:
+                    continue
+                self.summary = _clip(updated.strip(), Config.MEMORY_SUMMARY_MAX_CHARS)
+                del self._pending[:len(turns)]
+                self.summary_updates += 1
+
+    def prompt_context(self) -> str:
+        """Summary plus recent turns, for the answer and condense prompts."""
+        with self._lock:
+            summary = self.summary
+            # Turns still being folded stay visible verbatim until the summary catches up
+            recent = (self._pending + list(self._turns))[-2 * self.recent_turns:]
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if recent:
+            parts.append(format_turns(recent))
+        return "\n\n".join(parts)
+
+    def condense(self, question: str) -> str:
+        """
+        Rewrites a follow-up into a standalone retrieval query.
+        Questions that do not refer back to the conversation are returned as they are,
+        which saves the extra LLM call for most self-contained questions.
+        """
+        if not self.has_history() or not FOLLOW_UP_PATTERN.search(question):
+            return question
+
+        chain = ChatPromptTemplate.from_template(CONDENSE_TEMPLATE) | self.llm
+        try:
+            standalone = chain.invoke({"history": self.prompt_context(), "question": question}).content
+        except Exception:
+            return question
+        return standalone.strip() or question
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self._pending.clear()
+            self.summary = ""
+            self.total_turns = 0
+            self._epoch += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "turns": self.total_turns,
+                "verbatim_turns": len(self._turns),
+                "pending_turns": len(self._pending),
+                "summary_chars": len(self.summary),
+                "summary_updates": self.summary_updates,
+            }
@@ -0,0 +1,164 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.prompts import ChatPromptTemplate
+from config import Config
+from cache import LRUCache
+from utils import chunk_key
+
+# Fan-out searches from every session share this pool
+_FANOUT_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="multi-query")
+
+# Keyed by (generator, model, normalized query): repeated questions skip the paraphrase call
+PARAPHRASE_CACHE = LRUCache(maxsize=2000, ttl=3600)
+
+STOPWORDS = frozenset(
+    "a an the is are was were be been being do does did of in on at to for from by with about "
+    "and or but what which who whom whose when where why how can could should would will shall "
+    "may might must i me my we our you your it its this that these those there please tell explain "
+    "describe give show list".split()
+)
+
+TEMPLATES = (
+    "{keywords}",
+    "Information about {keywords}",
+    "Details and explanation of {keywords}",
+    "{keywords} definition and examples",
+)
+
+PARAPHRASE_TEMPLATE = """
+Write {n} different search queries that would find passages answering the question below.
+Use different wording and synonyms; keep names, numbers and technical terms.
+Return one query per line, with no numbering and no extra text.
+
+Question: {question}
+"""
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def keyword_query(user_query: str) -> str:
+    """The question reduced to its content words."""
+    words = re.findall(r"[\w'-]+", user_query)
+    keywords = [w for w in words if w.lower() not in STOPWORDS]
+    return " ".join(keywords or words)
+
+
+def template_paraphrases(user_query: str, n: int) -> list[str]:
+    """Local, zero-latency query variants built from the question's keywords."""
+    keywords = keyword_query(user_query)
+    variants = []
+    seen = {_normalize(user_query)}
+    for template in TEMPLATES:
+        variant = template.format(keywords=keywords)
+        if _normalize(variant) not in seen:
+            seen.add(_normalize(variant))
+            variants.append(variant)
+    return variants[:n]
+
+
+def llm_paraphrases(user_query: str, llm, n: int) -> list[str]:
+    """Paraphrases from a cheap model; falls back to the templates if the call fails."""
+    chain = ChatPromptTemplate.from_template(PARAPHRASE_TEMPLATE) | llm
+    try:
+        response = chain.invoke({"question": user_query, "n": n}).content
+    except Exception:
+        return template_paraphrases(user_query, n)
+
+    variants = []
+    seen = {_normalize(user_query)}
+    for line in response.splitlines():
+        variant = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+        if variant and _normalize(variant) not in seen:
+            seen.add(_normalize(variant))
+            variants.append(variant)
+    return variants[:n] or template_paraphrases(user_query, n)
+
+
+def reciprocal_rank_fusion(ranked_lists, limit: int, rrf_k: int = None):
+    """
+    Merges several best-first (Document, score) lists with reciprocal rank fusion.
+    The same chunk found by several queries is kept once (by chunk_key), scored by
+    sum(1 / (rrf_k + rank)). Returns (Document, best dense score) pairs in fused order,
+    with metadata["rrf_score"] set.
+    """
+    rrf_k = rrf_k or Config.RRF_K
+    fused = {}
+    for results in ranked_lists:
+        for rank, (doc, score) in enumerate(results, start=1):
+            key = chunk_key(doc)
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [doc, score, 1.0 / (rrf_k + rank)]
+            else:
+                entry[1] = max(entry[1], score)
+                entry[2] += 1.0 / (rrf_k + rank)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[2], reverse=True)[:limit]
+    for doc, _, rrf_score in ranked:
+        doc.metadata["rrf_score"] = round(rrf_score, 6)
+    return [(doc, score) for doc, score, _ in ranked]
+
+
+class MultiQueryRetriever:
+    """
+    Retrieves with the question plus a few paraphrases and fuses the results.
+    The original question is searched right away, while paraphrases are produced;
+    the paraphrases are then embedded in one batched call and searched concurrently,
+    so latency stays close to a single search (plus the paraphrase call in "llm" mode).
+    """
+
+    def __init__(self, vectorstore, llm=None):
+        self.vectorstore = vectorstore
+        self.llm = llm
+
+    def paraphrases(self, user_query: str, n: int) -> list[str]:
+        generator = Config.MULTI_QUERY_GENERATOR if self.llm is not None else "template"
+        key = (generator, Config.MULTI_QUERY_MODEL, _normalize(user_query), n)
+        variants = PARAPHRASE_CACHE.get(key)
+        if variants is None:
+            if generator == "llm":
+                variants = llm_paraphrases(user_query, self.llm, n)
+            else:
+                variants = template_paraphrases(user_query, n)
+            PARAPHRASE_CACHE.set(key, variants)
+        return variants
+
+    def _embed_queries(self, queries: list[str]) -> list[list[float]]:
+        embeddings = self.vectorstore.embeddings
+        if hasattr(embeddings, "embed_queries"):
+            return embeddings.embed_queries(queries)
+        return list(_FANOUT_EXECUTOR.map(embeddings.embed_query, queries))
+
+    def _search(self, embedding, k: int, filter: dict = None):
+        return self.vectorstore.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def retrieve(self, user_query: str, k: int, filter: dict = None, n: int = None):
+        """Returns fused (Document, score) pairs, best first, and a metrics dict."""
+        n = Config.MULTI_QUERY_COUNT if n is None else n
+        start_time = time.time()
+
+        # 1. Original query, in parallel with paraphrase generation
+        original = _FANOUT_EXECUTOR.submit(
+            lambda: self.vectorstore.similarity_search_with_score(user_query, k=k, filter=filter)
+        )
+        variants = self.paraphrases(user_query, n) if n > 0 else []
+
+        # 2. Paraphrases: one batched embedding call, concurrent searches
+        futures = []
+        if variants:
+            vectors = self._embed_queries(variants)
+            futures = [_FANOUT_EXECUTOR.submit(self._search, vector, k, filter) for vector in vectors]
+        ranked_lists = [original.result()] + [future.result() for future in futures]
+
+        # 3. Fuse
+        fused = reciprocal_rank_fusion(ranked_lists, limit=k)
+        metrics = {
+            "queries": [user_query] + variants,
+            "candidates": sum(len(results) for results in ranked_lists),
+            "unique": len({chunk_key(doc) for results in ranked_lists for doc, _ in results}),
+            "latency": round(time.time() - start_time, 3),
+        }
+        return fused, metrics
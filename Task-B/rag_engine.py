@@ -1,58 +1,318 @@
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_cohere import CohereRerank
-from langchain_classic.retrievers.contextual_compression import ContextualCompressionRetriever
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from config import Config
+from singleflight import SingleFlight
+from rerank_policy import decide_rerank, rerank_key, RERANK_STATS, RERANK_CACHE
+from utils import chunk_key
+from llm_router import route_query, estimate_cost, ROUTER_STATS
+from summarizer import DocumentSummarizer
+from docstore import hydrate_documents
+from multi_query import MultiQueryRetriever
+from cassette import get_cassette, CassetteChatModel, CassetteReranker
+
+# Process-wide so that duplicate questions from different sessions share one run
+_QUERY_FLIGHT = SingleFlight()
+
+# Rerank calls run here so a slow Cohere response can be abandoned at the deadline
+_RERANK_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rerank")
+
+# Speculative generations started before reranking has finished
+_GENERATION_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-gen")
+
+
+def build_chat_model(model: str):
+    """Gemini chat model for a tier, wrapped for record/replay when a cassette is active."""
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return CassetteChatModel(None, model, cassette)
+
+    llm = ChatGoogleGenerativeAI(
+        model=model,
+        temperature=0,
+        convert_system_message_to_human=True
+    )
+    return CassetteChatModel(llm, model, cassette) if cassette else llm
+
+
+def normalize_query(user_query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used for coalescing."""
+    return " ".join(user_query.lower().split())
+
 
 class RAGEngine:
-    def __init__(self, vectorstore):
+    def __init__(self, vectorstore, chat_model_factory=None, reranker=None):
+        """
+        `chat_model_factory(model)` and `reranker` replace the Gemini and Cohere
+        clients, e.g. with the stand-ins used by load_test.py.
+        """
         self.vectorstore = vectorstore
-        self.llm = ChatGoogleGenerativeAI(
-            model=Config.LLM_MODEL,
-            temperature=0,
-            convert_system_message_to_human=True
-        )
+        self._chat_model_factory = chat_model_factory or build_chat_model
+        self.llm = self._chat_model_factory(Config.LLM_MODEL)
+        self._llms = {Config.LLM_MODEL: self.llm}
+        self._reranker = reranker
 
-    def _get_reranker_pipeline(self):
-        """Sets up the Base Retriever -> Cohere Reranker pipeline."""
-        base_retriever = self.vectorstore.as_retriever(
-            search_type="mmr",
-            search_kwargs={"k": 10}
-        )
-        
-        compressor = CohereRerank(
-            cohere_api_key=Config.COHERE_API_KEY,
-            top_n=3, 
-            model=Config.RERANKER_MODEL
-        )
-        
-        return ContextualCompressionRetriever(
-            base_compressor=compressor, 
-            base_retriever=base_retriever
+    def _get_llm(self, model: str):
+        """Returns the chat model for a router tier, created on first use."""
+        if model not in self._llms:
+            self._llms[model] = self._chat_model_factory(model)
+        return self._llms[model]
+
+    def _route(self, user_query: str, docs, confidence):
+        """Picks the model tier for a question and its context."""
+        context_chars = sum(len(doc.page_content) for doc in docs)
+        return route_query(user_query, context_chars, confidence)
+
+    def _get_reranker(self):
+        """Returns the Cohere reranker, created once per engine."""
+        if self._reranker is None:
+            cassette = get_cassette()
+            reranker = None
+            if cassette is None or not cassette.replaying:
+                reranker = CohereRerank(
+                    cohere_api_key=Config.COHERE_API_KEY,
+                    top_n=Config.RERANK_TOP_N,
+                    model=Config.RERANKER_MODEL
+                )
+            self._reranker = CassetteReranker(reranker, cassette) if cassette else reranker
+        return self._reranker
+
+    def _retrieve(self, user_query: str, sources=None, k: int = None):
+        """
+        Dense retrieval. Returns (Document, score) pairs, best first, and the
+        multi-query metrics (None unless MULTI_QUERY is enabled).
+        """
+        search_kwargs = {"k": k or Config.RETRIEVAL_K}
+        if sources:
+            search_kwargs["filter"] = {"source": {"$in": list(sources)}}
+
+        if Config.MULTI_QUERY:
+            llm = self._get_llm(Config.MULTI_QUERY_MODEL) if Config.MULTI_QUERY_GENERATOR == "llm" else None
+            return MultiQueryRetriever(self.vectorstore, llm).retrieve(user_query, **search_kwargs)
+
+        return self.vectorstore.similarity_search_with_score(user_query, **search_kwargs), None
+
+    def _rerank_candidates(self, user_query: str, candidates, top_n: int, keys: list[str], cached: dict):
+        """
+        Scores candidates with Cohere, sending only those without a cached score.
+        Returns copies of the top_n, best first, with relevance_score set; the
+        candidates themselves are never modified.
+        """
+        scores = dict(cached)
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        if missing:
+            # The cache needs every candidate's score, not just the top_n
+            results = self._get_reranker().rerank(
+                [candidates[i].page_content for i in missing],
+                user_query,
+                top_n=len(missing) if Config.RERANK_CACHE_ENABLED else top_n
+            )
+            for result in results:
+                scores[keys[missing[result["index"]]]] = result["relevance_score"]
+            if Config.RERANK_CACHE_ENABLED:
+                RERANK_CACHE.store(normalize_query(user_query), scores)
+
+        ranked = sorted(
+            (i for i, key in enumerate(keys) if key in scores),
+            key=lambda i: scores[keys[i]],
+            reverse=True
         )
+        # Scored copies: after a missed deadline this still runs while the caller (and any
+        # coalesced waiters) use the original documents in dense order
+        return [
+            Document(
+                page_content=candidates[i].page_content,
+                metadata=dict(candidates[i].metadata, relevance_score=scores[keys[i]]),
+                id=candidates[i].id
+            )
+            for i in ranked[:top_n]
+        ]
 
-    def query(self, user_query: str):
+    def _rerank(self, user_query: str, scored_docs, top_n: int = None):
+        """
+        Applies the adaptive rerank policy to the dense candidates.
+        Returns the top documents and a metrics dict describing the decision.
+        """
+        top_n = top_n or Config.RERANK_TOP_N
+        docs = [doc for doc, _ in scored_docs]
+        scores = [score for _, score in scored_docs]
+        decision = decide_rerank(scores)
+        decision.update({"rerank_latency": 0.0, "timed_out": False, "agrees_with_dense": None})
+
+        # Compact stores return text-less stubs; fetch text only for chunks we use
+        hydrate_documents(self.vectorstore, docs[:max(decision["candidates"], top_n)])
+
+        if decision["action"] == "skip":
+            decision["latency_saved"] = RERANK_STATS.record(decision)
+            return docs[:top_n], decision
+
+        candidates = docs[:max(decision["candidates"], top_n)]
+        keys = [rerank_key(doc, chunk_key(doc)) for doc in candidates]
+        cached = RERANK_CACHE.lookup(normalize_query(user_query), keys) if Config.RERANK_CACHE_ENABLED else {}
+        decision["cache"] = "hit" if len(cached) == len(keys) else "partial" if cached else "miss"
+        decision["cached_scores"] = len(cached)
+
+        start_time = time.time()
+        if decision["cache"] == "hit":
+            reranked = self._rerank_candidates(user_query, candidates, top_n, keys, cached)
+        else:
+            future = _RERANK_EXECUTOR.submit(self._rerank_candidates, user_query, candidates, top_n, keys, cached)
+            try:
+                reranked = list(future.result(timeout=Config.RERANK_DEADLINE_SECONDS))
+            except FuturesTimeout:
+                # Past the deadline: serve dense order; the late call still fills the cache
+                decision["timed_out"] = True
+                reranked = docs[:top_n]
+        decision["rerank_latency"] = round(time.time() - start_time, 3)
+
+        if reranked and not decision["timed_out"]:
+            decision["agrees_with_dense"] = chunk_key(reranked[0]) == chunk_key(docs[0])
+
+        decision["latency_saved"] = RERANK_STATS.record(decision)
+        return reranked, decision
+
+    def query(self, user_query: str, sources=None, memory=None):
         """
         Executes the full RAG pipeline: Retrieve -> Rerank -> Generate.
         Returns a dictionary with the answer, source documents, and metrics.
+
+        Concurrent calls with the same normalized query and source set are
+        coalesced: only one pipeline runs and every caller gets its result.
+
+        With a ConversationMemory, follow-ups are condensed into a standalone
+        retrieval query and the bounded conversation history is added to the prompt.
+        The caller records the finished turn with memory.add_turn().
+        """
+        source_set = tuple(sorted(set(sources))) if sources else None
+        retrieval_query, history = user_query, ""
+        if memory is not None and memory.has_history():
+            retrieval_query = memory.condense(user_query)
+            history = memory.prompt_context()
+
+        key = (normalize_query(retrieval_query), Config.NAMESPACE, source_set, history)
+        result = self._coalesced(key, self._run_pipeline, user_query, source_set, retrieval_query, history)
+        if result is not None and memory is not None:
+            result["metrics"]["memory"] = dict(
+                memory.stats(),
+                standalone_query=retrieval_query if retrieval_query != user_query else None,
+                history_chars=len(history)
+            )
+        return result
+
+    def search(self, user_query: str, k: int = None, rerank: bool = True, sources=None):
+        """
+        Retrieval-only path: returns ranked chunks with scores and metadata, no generation.
+        Shares coalescing, the adaptive rerank policy and metrics with query().
+        Set rerank=False to return dense order without calling Cohere.
         """
+        k = k or Config.SEARCH_DEFAULT_K
+        source_set = tuple(sorted(set(sources))) if sources else None
+        key = ("search", normalize_query(user_query), Config.NAMESPACE, source_set, k, rerank)
+        return self._coalesced(key, self._run_search, user_query, k, rerank, source_set)
+
+    def _coalesced(self, key, fn, *args):
+        """Runs fn through the process-wide single-flight group and tags the metrics."""
         start_time = time.time()
-        
-        # 1. Retrieve & Rerank
-        retrieval_chain = self._get_reranker_pipeline()
-        retrieved_docs = retrieval_chain.invoke(user_query)
-        
-        if not retrieved_docs:
+        # Only callers searching the same store may share a run
+        key = (id(self.vectorstore),) + key
+        result, shared = _QUERY_FLIGHT.do(key, fn, *args)
+        if result is None:
+            return None
+
+        # Copy so that waiters never mutate the leader's result
+        metrics = dict(result["metrics"], coalesced=shared)
+        if shared:
+            metrics["latency"] = round(time.time() - start_time, 2)
+        return dict(result, metrics=metrics)
+
+    def _run_search(self, user_query: str, k: int, rerank: bool, sources=None):
+        start_time = time.time()
+
+        scored_docs, expansion = self._retrieve(user_query, sources, k=max(k, Config.RETRIEVAL_K))
+        if not scored_docs:
+            return None
+        dense_scores = {id(doc): score for doc, score in scored_docs}
+
+        if rerank:
+            docs, rerank_metrics = self._rerank(user_query, scored_docs, top_n=k)
+        else:
+            docs = hydrate_documents(self.vectorstore, [doc for doc, _ in scored_docs[:k]])
+            rerank_metrics = {"action": "disabled"}
+
+        results = [
+            {
+                "text": doc.page_content,
+                "source": doc.metadata.get("source", "Unknown Source"),
+                "chunk_id": doc.metadata.get("chunk_id"),
+                "dense_score": dense_scores.get(id(doc)),
+                "rerank_score": doc.metadata.get("relevance_score"),
+                "metadata": doc.metadata,
+            }
+            for doc in docs
+        ]
+        metrics = {
+            "latency": round(time.time() - start_time, 3),
+            "rerank": rerank_metrics
+        }
+        if expansion:
+            metrics["multi_query"] = expansion
+        return {
+            "results": results,
+            "metrics": metrics
+        }
+
+    def summarize(self, source_name: str):
+        """
+        Summarizes a whole source with parallel map-reduce over all of its chunks.
+        Returns the same shape as query(), with the summary as the answer.
+        """
+        key = ("summary", Config.NAMESPACE, source_name)
+        return self._coalesced(key, self._run_summary, source_name)
+
+    def _run_summary(self, source_name: str):
+        start_time = time.time()
+
+        # 1. Fetch every chunk of the source, in reading order
+        docstore = getattr(self.vectorstore, "docstore", None)
+        if docstore is not None:
+            docs = docstore.documents_for_source(source_name)
+        else:
+            docs = self.vectorstore.similarity_search(
+                source_name, k=Config.SUMMARY_MAX_CHUNKS, filter={"source": source_name}
+            )
+        if not docs:
+            return None
+        docs.sort(key=lambda doc: doc.metadata.get("chunk_id", 0))
+
+        # 2. Map-Reduce
+        summarizer = DocumentSummarizer(self._get_llm(Config.SUMMARY_MODEL), Config.SUMMARY_MODEL)
+        summary = summarizer.summarize(docs)
+        if summary is None:
             return None
 
-        # 2. Format Context
+        cost = estimate_cost(Config.SUMMARY_MODEL, summary.pop("prompt_chars"))
+        return {
+            "answer": summary.pop("summary"),
+            "sources": [],
+            "metrics": {
+                "latency": round(time.time() - start_time, 2),
+                "cost": f"${cost:.6f}",
+                "summary": summary
+            }
+        }
+
+    def _generate(self, user_query: str, docs, route: dict, history: str = ""):
+        """Formats the numbered context and asks the routed LLM. Returns (answer, context)."""
+        # 1. Format Context
         formatted_context = "\n\n".join(
             f"[{i+1}] {doc.page_content}" 
-            for i, doc in enumerate(retrieved_docs)
+            for i, doc in enumerate(docs)
         )
 
-        # 3. Define Prompt
+        # 2. Define Prompt
         template = """
         You are a helpful AI assistant. Answer the question based ONLY on the provided context below.
         
@@ -66,25 +326,103 @@ class RAGEngine:
         
         Question: {question}
         """
+        if history:
+            template = template.replace(
+                "Question: {question}",
+                "Conversation so far (for resolving references only, not a source of facts):\n"
+                "        {history}\n        \n        Question: {question}"
+            )
         prompt = ChatPromptTemplate.from_template(template)
         
-        # 4. Generate Answer
-        chain = prompt | self.llm
-        response = chain.invoke({"context": formatted_context, "question": user_query})
+        # 3. Generate Answer
+        start_time = time.time()
+        chain = prompt | self._get_llm(route["model"])
+        response = chain.invoke({"context": formatted_context, "question": user_query, "history": history})
+
+        ROUTER_STATS.record(
+            route["tier"],
+            time.time() - start_time,
+            estimate_cost(route["model"], len(formatted_context) + len(user_query) + len(history))
+        )
+        return response.content, formatted_context
+
+    def _speculate(self, user_query: str, scored_docs, route: dict, retrieval_query: str, history: str):
+        """
+        Starts generation on the dense top-n while reranking runs.
+        The speculative answer is kept if the reranked top-n is the same set of
+        chunks; otherwise it is cancelled (or discarded if already running) and
+        the answer is regenerated from the reranked documents.
+        """
+        speculative_docs = [doc for doc, _ in scored_docs[:Config.RERANK_TOP_N]]
+        future = _GENERATION_EXECUTOR.submit(self._generate, user_query, speculative_docs, route, history)
+
+        reranked_docs, rerank_metrics = self._rerank(retrieval_query, scored_docs)
+
+        hit = {chunk_key(d) for d in reranked_docs} == {chunk_key(d) for d in speculative_docs}
+        wasted_chars = 0
+        if hit:
+            # Keep speculative order so the [n] citations match the sources shown
+            answer, formatted_context = future.result()
+            docs = speculative_docs
+        else:
+            # A generation that already started cannot be interrupted; abandon it
+            if not future.cancel():
+                wasted_chars = sum(len(d.page_content) for d in speculative_docs)
+            answer, formatted_context = self._generate(user_query, reranked_docs, route, history)
+            docs = reranked_docs
+
+        speculation = {"hit": hit, "wasted_chars": wasted_chars}
+        return answer, formatted_context, docs, rerank_metrics, speculation
+
+    def _run_pipeline(self, user_query: str, sources=None, retrieval_query: str = None, history: str = ""):
+        """Single, uncoalesced execution of Retrieve -> Rerank -> Generate."""
+        start_time = time.time()
+        retrieval_query = retrieval_query or user_query
+        
+        # 1. Retrieve
+        scored_docs, expansion = self._retrieve(retrieval_query, sources)
+        if not scored_docs:
+            return None
+
+        # 2. Rerank & Generate (optionally overlapped)
+        # Speculation has to route before reranking, so it uses the dense confidence
+        speculation = None
+        if Config.SPECULATIVE_GENERATION:
+            dense_top = hydrate_documents(
+                self.vectorstore, [doc for doc, _ in scored_docs[:Config.RERANK_TOP_N]]
+            )
+            route = self._route(retrieval_query, dense_top, scored_docs[0][1])
+            answer, formatted_context, retrieved_docs, rerank_metrics, speculation = \
+                self._speculate(user_query, scored_docs, route, retrieval_query, history)
+        else:
+            retrieved_docs, rerank_metrics = self._rerank(retrieval_query, scored_docs)
+            if not retrieved_docs:
+                return None
+            confidence = retrieved_docs[0].metadata.get("relevance_score", scored_docs[0][1])
+            route = self._route(retrieval_query, retrieved_docs, confidence)
+            answer, formatted_context = self._generate(user_query, retrieved_docs, route, history)
         
         end_time = time.time()
         
-        # 5. Calculate Metrics (Rough Estimation)
-        total_chars = len(formatted_context) + len(user_query)
-        # Approx 4 chars per token
-        est_tokens = total_chars / 4  
-        cost = (est_tokens / 1000) * 0.0000185  # Gemini Flash Pricing
+        # 3. Calculate Metrics (Rough Estimation)
+        total_chars = len(formatted_context) + len(user_query) + len(history)
+        if speculation:
+            total_chars += speculation["wasted_chars"]
+        cost = estimate_cost(route["model"], total_chars)
+
+        metrics = {
+            "latency": round(end_time - start_time, 2),
+            "cost": f"${cost:.6f}",
+            "rerank": rerank_metrics,
+            "router": dict(route, tiers=ROUTER_STATS.snapshot())
+        }
+        if speculation:
+            metrics["speculation"] = speculation
+        if expansion:
+            metrics["multi_query"] = expansion
 
         return {
-            "answer": response.content,
+            "answer": answer,
             "sources": retrieved_docs,
-            "metrics": {
-                "latency": round(end_time - start_time, 2),
-                "cost": f"${cost:.6f}"
-            }
-        }
\ No newline at end of file
+            "metrics": metrics
+        }
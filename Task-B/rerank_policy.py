@@ -0,0 +1,169 @@
+import math
+import hashlib
+import threading
+from config import Config
+from cache import LRUCache
+
+
+def score_margin(scores: list[float]) -> float:
+    """Gap between the best and second-best dense score."""
+    ranked = sorted(scores, reverse=True)
+    if len(ranked) < 2:
+        return 1.0
+    return ranked[0] - ranked[1]
+
+
+def score_entropy(scores: list[float], temperature: float = None) -> float:
+    """
+    Normalized Shannon entropy (0..1) of the softmax over dense scores.
+    Low entropy means the probability mass sits on very few candidates.
+    """
+    if len(scores) < 2:
+        return 0.0
+    temperature = temperature or Config.RERANK_ENTROPY_TEMPERATURE
+
+    top = max(scores)
+    weights = [math.exp((s - top) / temperature) for s in scores]
+    total = sum(weights)
+    probs = [w / total for w in weights]
+
+    entropy = -sum(p * math.log(p) for p in probs if p > 0)
+    return entropy / math.log(len(scores))
+
+
+def decide_rerank(scores: list[float]) -> dict:
+    """
+    Picks how much reranking a candidate set needs from its dense score distribution.
+    - "skip":   the dense top hit is decisive, keep dense order.
+    - "shrink": fairly confident, only rerank the leading candidates.
+    - "full":   ambiguous, rerank every candidate.
+    """
+    margin = score_margin(scores)
+    entropy = score_entropy(scores)
+
+    if not Config.ADAPTIVE_RERANK:
+        action, candidates = "full", len(scores)
+    elif margin >= Config.RERANK_SKIP_MARGIN and entropy <= Config.RERANK_SKIP_MAX_ENTROPY:
+        action, candidates = "skip", 0
+    elif margin >= Config.RERANK_SHRINK_MARGIN:
+        action, candidates = "shrink", min(len(scores), Config.RERANK_SHRINK_K)
+    else:
+        action, candidates = "full", len(scores)
+
+    return {
+        "action": action,
+        "candidates": candidates,
+        "margin": round(margin, 4),
+        "entropy": round(entropy, 4),
+    }
+
+
+class RerankStats:
+    """
+    Process-wide record of rerank decisions. Keeps an EWMA of real rerank
+    latency so skipped reranks can report the time they saved, and counts how
+    often a full rerank agreed with dense order (the quality side of the trade).
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        self._lock = threading.Lock()
+        self.alpha = alpha
+        self.latency_ewma = None
+        self.counts = {"skip": 0, "shrink": 0, "full": 0, "timed_out": 0}
+        self.agreements = 0
+        self.compared = 0
+        self.latency_saved = 0.0
+
+    def record(self, decision: dict) -> float:
+        """Folds one decision into the stats. Returns the latency it saved (seconds)."""
+        with self._lock:
+            self.counts[decision["action"]] += 1
+            if decision["timed_out"]:
+                self.counts["timed_out"] += 1
+            elif decision["action"] != "skip" and decision.get("cache") != "hit":
+                latency = decision["rerank_latency"]
+                if self.latency_ewma is None:
+                    self.latency_ewma = latency
+                else:
+                    self.latency_ewma = self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+
+            if decision["agrees_with_dense"] is not None:
+                self.compared += 1
+                self.agreements += int(decision["agrees_with_dense"])
+
+            saved = 0.0
+            if decision["action"] == "skip" and self.latency_ewma is not None:
+                saved = self.latency_ewma
+            self.latency_saved += saved
+            return round(saved, 3)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "decisions": dict(self.counts),
+                "rerank_latency_ewma": round(self.latency_ewma or 0.0, 3),
+                "dense_agreement_rate": round(self.agreements / self.compared, 3) if self.compared else None,
+                "total_latency_saved": round(self.latency_saved, 3),
+            }
+
+
+RERANK_STATS = RerankStats()
+
+
+def rerank_key(doc, chunk_id: str) -> str:
+    """Cache identity of a candidate: its chunk ID plus a digest of the text that was scored."""
+    digest = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:12]
+    return f"{chunk_id}:{digest}"
+
+
+class RerankCache:
+    """
+    Memoizes rerank relevance scores.
+    Cohere scores each (query, document) pair independently of the other candidates,
+    so scores are stored per pair and a partially overlapping candidate set only
+    needs the new candidates scored. A second map keyed by the query plus the sorted
+    candidate IDs answers exact repeats (UI reruns, popular questions) in one lookup.
+    Both maps are LRU with a TTL.
+    """
+
+    def __init__(self, maxsize: int = None, ttl: float = None):
+        maxsize = maxsize or Config.RERANK_CACHE_SIZE
+        ttl = ttl or Config.RERANK_CACHE_TTL
+        self.pairs = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.sets = LRUCache(maxsize=max(maxsize // 10, 1), ttl=ttl)
+        self._lock = threading.Lock()
+        self.counts = {"hit": 0, "partial": 0, "miss": 0}
+        self.scores_reused = 0
+
+    @staticmethod
+    def _set_key(query: str, keys: list[str]):
+        return (Config.RERANKER_MODEL, query, tuple(sorted(keys)))
+
+    def lookup(self, query: str, keys: list[str]) -> dict:
+        """Cached {key: score} for the candidates; `query` should already be normalized."""
+        scores = self.sets.get(self._set_key(query, keys))
+        if scores is None:
+            scores = {}
+            for key in keys:
+                score = self.pairs.get((Config.RERANKER_MODEL, query, key))
+                if score is not None:
+                    scores[key] = score
+
+        status = "hit" if len(scores) == len(keys) else "partial" if scores else "miss"
+        with self._lock:
+            self.counts[status] += 1
+            self.scores_reused += len(scores)
+        return dict(scores)
+
+    def store(self, query: str, scores: dict):
+        """Records the scores of a complete candidate set."""
+        for key, score in scores.items():
+            self.pairs.set((Config.RERANKER_MODEL, query, key), score)
+        self.sets.set(self._set_key(query, list(scores)), dict(scores))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts, scores_reused=self.scores_reused, pairs=len(self.pairs))
+
+
+RERANK_CACHE = RerankCache()
@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+    The first caller (the leader) runs the function; callers arriving while
+    it is still in flight wait on the same result instead of repeating the work.
+    Nothing is kept once the call finishes, so results are never stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) once per in-flight key.
+        Returns a tuple (result, shared) where shared is True for callers
+        that received the leader's result. Exceptions propagate to all waiters.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def claim(self, key):
+        """
+        Non-blocking variant used for batch coalescing.
+        Returns (future, is_leader). The leader must later call resolve()
+        or fail() for the key; other callers wait on the returned future.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def resolve(self, key, result):
+        """Publishes a leader's result and releases the key."""
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is not None:
+            future.set_result(result)
+
+    def fail(self, key, error: BaseException):
+        """Publishes a leader's failure and releases the key."""
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is not None:
+            future.set_exception(error)
+
+    def in_flight(self) -> int:
+        """Number of keys currently being executed."""
+        with self._lock:
+            return len(self._calls)
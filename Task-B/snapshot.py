@@ -0,0 +1,276 @@
+"""
+Snapshot export/import of a vector namespace.
+
+    python snapshot.py export prod.npz --half
+    python snapshot.py import prod.npz --workers 16
+
+A snapshot is one compressed .npz with columnar arrays: chunk IDs, vectors, sources,
+chunk numbers, chunk texts and full metadata, plus a JSON manifest (embedding model,
+dimension, namespace, per-source chunk counts). Importing upserts the stored vectors
+directly, so cloning an environment needs no embedding calls at all.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from config import Config
+
+SNAPSHOT_VERSION = 1
+TEXT_KEY = "text"  # where PineconeVectorStore keeps chunk text in vector metadata
+
+
+def _batches(n: int, size: int):
+    return [(start, min(start + size, n)) for start in range(0, n, size)]
+
+
+def _pinecone_index():
+    from vector_store import get_pinecone_index
+    return get_pinecone_index()
+
+
+def _docstore():
+    from docstore import SQLiteDocstore
+    return SQLiteDocstore() if Config.COMPACT_METADATA else None
+
+
+# --- Export ---
+
+def _export_local() -> dict:
+    from local_store import LocalVectorStore
+    if not Config.LOCAL_INDEX_PATH or not os.path.exists(Config.LOCAL_INDEX_PATH):
+        raise FileNotFoundError(f"No local index at '{Config.LOCAL_INDEX_PATH}' (LOCAL_INDEX_PATH)")
+    store = LocalVectorStore.load(Config.LOCAL_INDEX_PATH, embedding=None)
+    return {
+        "ids": list(store.ids),
+        "vectors": store.vectors,
+        "texts": list(store.texts),
+        "metadatas": list(store.metadatas),
+    }
+
+
+def _export_pinecone(namespace: str, workers: int, progress=None) -> dict:
+    index = _pinecone_index()
+    ids = sorted(doc_id for page in index.list(namespace=namespace) for doc_id in page)
+    batches = _batches(len(ids), Config.SNAPSHOT_FETCH_BATCH)
+
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(index.fetch, ids=ids[start:end], namespace=namespace)
+            for start, end in batches
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            fetched.update(future.result().vectors)
+            if progress:
+                progress(done, len(batches))
+
+    ids = [doc_id for doc_id in ids if doc_id in fetched]
+    metadatas = [dict(fetched[doc_id].metadata or {}) for doc_id in ids]
+    docstore = _docstore()
+    if docstore is not None:
+        # Compact vectors only carry filter fields; text and full metadata live in the docstore
+        stored = docstore.get_many(ids)
+        texts = [stored[i].page_content if i in stored else "" for i in ids]
+        metadatas = [stored[i].metadata if i in stored else m for i, m in zip(ids, metadatas)]
+    else:
+        texts = [metadata.pop(TEXT_KEY, "") for metadata in metadatas]
+
+    return {
+        "ids": ids,
+        "vectors": np.asarray([fetched[doc_id].values for doc_id in ids], dtype=np.float32),
+        "texts": texts,
+        "metadatas": metadatas,
+    }
+
+
+def export_snapshot(path: str, backend: str = None, namespace: str = None,
+                    half: bool = False, workers: int = None, progress=None) -> dict:
+    """
+    Writes the namespace to a snapshot file and returns its manifest.
+    `half` stores vectors as float16, halving the file at a negligible cost in cosine precision.
+    `progress(done_batches, total_batches)` is called while fetching from Pinecone.
+    """
+    backend = backend or Config.VECTOR_BACKEND
+    namespace = namespace or Config.NAMESPACE
+    workers = workers or Config.SNAPSHOT_WORKERS
+
+    if backend == "local":
+        columns = _export_local()
+    else:
+        columns = _export_pinecone(namespace, workers, progress)
+
+    vectors = np.asarray(columns["vectors"], dtype=np.float16 if half else np.float32)
+    if vectors.size == 0:
+        vectors = vectors.reshape(0, Config.EMBEDDING_DIMENSION)
+    sources = [str(m.get("source", "")) for m in columns["metadatas"]]
+    chunk_ids = [int(m.get("chunk_id", -1)) for m in columns["metadatas"]]
+
+    source_counts = {}
+    for source in sources:
+        source_counts[source] = source_counts.get(source, 0) + 1
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "backend": backend,
+        "namespace": namespace,
+        "embedding_model": Config.EMBEDDING_MODEL,
+        "dimension": int(vectors.shape[1]),
+        "dtype": str(vectors.dtype),
+        "count": len(columns["ids"]),
+        "sources": source_counts,
+    }
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            manifest=np.array(json.dumps(manifest)),
+            ids=np.array(columns["ids"], dtype=str),
+            vectors=vectors,
+            sources=np.array(sources, dtype=str),
+            chunk_ids=np.array(chunk_ids, dtype=np.int64),
+            texts=np.array(json.dumps(columns["texts"])),
+            metadatas=np.array(json.dumps(columns["metadatas"])),
+        )
+    os.replace(tmp_path, path)
+    return manifest
+
+
+# --- Import ---
+
+def read_snapshot(path: str) -> dict:
+    """Loads a snapshot file and checks it matches the configured embedding space."""
+    with np.load(path, allow_pickle=False) as data:
+        snapshot = {key: data[key] for key in data.files}
+
+    manifest = json.loads(str(snapshot["manifest"]))
+    if manifest["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {manifest['version']}")
+    if manifest["embedding_model"] != Config.EMBEDDING_MODEL or manifest["dimension"] != Config.EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"Snapshot was built with {manifest['embedding_model']} ({manifest['dimension']}d), "
+            f"this environment uses {Config.EMBEDDING_MODEL} ({Config.EMBEDDING_DIMENSION}d)"
+        )
+
+    return {
+        "manifest": manifest,
+        "ids": snapshot["ids"].tolist(),
+        "vectors": snapshot["vectors"].astype(np.float32),
+        "texts": json.loads(str(snapshot["texts"])),
+        "metadatas": json.loads(str(snapshot["metadatas"])),
+    }
+
+
+def _import_local(snapshot: dict, progress=None):
+    from local_store import LocalVectorStore
+    from vector_store import get_embeddings
+
+    path = Config.LOCAL_INDEX_PATH
+    if not path:
+        raise ValueError("Set LOCAL_INDEX_PATH to import into the local backend")
+    if os.path.exists(path):
+        store = LocalVectorStore.load(path, get_embeddings())
+    else:
+        store = LocalVectorStore(get_embeddings(), path=path)
+
+    batches = _batches(len(snapshot["ids"]), Config.SNAPSHOT_LOCAL_BATCH)
+    for done, (start, end) in enumerate(batches, start=1):
+        store.add_vectors(
+            snapshot["vectors"][start:end],
+            snapshot["texts"][start:end],
+            snapshot["metadatas"][start:end],
+            snapshot["ids"][start:end],
+        )
+        if progress:
+            progress(done, len(batches))
+    store.save()
+
+
+def _import_pinecone(snapshot: dict, namespace: str, workers: int, progress=None):
+    from langchain_core.documents import Document
+
+    index = _pinecone_index()
+    ids, vectors, texts, metadatas = snapshot["ids"], snapshot["vectors"], snapshot["texts"], snapshot["metadatas"]
+
+    docstore = _docstore()
+    if docstore is not None:
+        # Texts first: a vector must never be searchable without its text
+        docstore.put_many(ids, [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)])
+        vector_metadatas = [
+            {k: m[k] for k in Config.VECTOR_METADATA_FIELDS if k in m} for m in metadatas
+        ]
+    else:
+        vector_metadatas = [dict(m, **{TEXT_KEY: t}) for t, m in zip(texts, metadatas)]
+
+    def upsert(start: int, end: int):
+        index.upsert(
+            vectors=[
+                {"id": ids[i], "values": vectors[i].tolist(), "metadata": vector_metadatas[i]}
+                for i in range(start, end)
+            ],
+            namespace=namespace
+        )
+
+    batches = _batches(len(ids), Config.UPSERT_BATCH_SIZE)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(upsert, start, end) for start, end in batches]
+        for done, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            if progress:
+                progress(done, len(batches))
+
+
+def import_snapshot(path: str, backend: str = None, namespace: str = None,
+                    workers: int = None, progress=None) -> dict:
+    """
+    Bulk-loads a snapshot into the configured backend (upsert by chunk ID, so
+    importing twice is idempotent). Returns the snapshot manifest.
+    `progress(done_batches, total_batches)` is called after each upsert batch.
+    """
+    backend = backend or Config.VECTOR_BACKEND
+    namespace = namespace or Config.NAMESPACE
+    workers = workers or Config.SNAPSHOT_WORKERS
+
+    snapshot = read_snapshot(path)
+    if backend == "local":
+        _import_local(snapshot, progress)
+    else:
+        _import_pinecone(snapshot, namespace, workers, progress)
+    return snapshot["manifest"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import a vector namespace snapshot.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot file (.npz)")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default=Config.VECTOR_BACKEND)
+    parser.add_argument("--namespace", default=Config.NAMESPACE)
+    parser.add_argument("--workers", type=int, default=Config.SNAPSHOT_WORKERS, help="Parallel fetch/upsert requests")
+    parser.add_argument("--half", action="store_true", help="Store vectors as float16 (export only)")
+    args = parser.parse_args(argv)
+
+    if args.backend == "pinecone" and not Config.PINECONE_API_KEY:
+        sys.exit("Missing API Keys in .env: PINECONE_API_KEY")
+
+    start_time = time.time()
+
+    def progress(done, total):
+        print(f"\r  {done}/{total} batches ({time.time() - start_time:.1f}s)", end="", flush=True)
+
+    if args.command == "export":
+        manifest = export_snapshot(args.path, args.backend, args.namespace, args.half, args.workers, progress)
+        size = os.path.getsize(args.path)
+        print(f"\nExported {manifest['count']} chunks from {len(manifest['sources'])} sources "
+              f"to {args.path} ({size / 1e6:.1f} MB, {time.time() - start_time:.1f}s)")
+    else:
+        manifest = import_snapshot(args.path, args.backend, args.namespace, args.workers, progress)
+        elapsed = max(time.time() - start_time, 1e-9)
+        print(f"\nImported {manifest['count']} chunks from {len(manifest['sources'])} sources "
+              f"({manifest['count'] / elapsed:.0f} chunks/s, {elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import re
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.prompts import ChatPromptTemplate
+from config import Config
+from cache import LRUCache
+
+# Bounded process-wide so parallel summaries from many sessions respect provider RPM limits
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(
+    max_workers=Config.SUMMARY_CONCURRENCY, thread_name_prefix="summarize"
+)
+
+# Keyed by (model, stage, content hash): unchanged chunks are never summarized twice
+SUMMARY_CACHE = LRUCache(maxsize=Config.SUMMARY_CACHE_SIZE)
+
+# Summarization is an explicit command: a map-reduce over every chunk is too costly
+# to trigger from wording that targeted questions share ("overview of the auth flow")
+SUMMARY_COMMAND_PATTERN = re.compile(r"^\s*/summari[sz]e\b", re.IGNORECASE)
+
+MAP_TEMPLATE = """
+Summarize the following excerpt of a document in 3-5 sentences.
+Keep concrete facts, numbers and names. Do not add information that is not in the excerpt.
+
+Excerpt:
+{text}
+"""
+
+REDUCE_TEMPLATE = """
+The following are summaries of consecutive parts of the same document.
+Merge them into a single coherent summary that preserves the key facts, numbers and names.
+
+Summaries:
+{text}
+"""
+
+
+def is_summary_request(user_query: str) -> bool:
+    """True for the explicit "/summarize" command; questions always go through retrieval."""
+    return bool(SUMMARY_COMMAND_PATTERN.match(user_query))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DocumentSummarizer:
+    """
+    Map-reduce summarizer over every chunk of a source.
+    Map: each chunk is summarized independently (bounded concurrency).
+    Reduce: summaries are merged in groups of SUMMARY_REDUCE_FANIN, level by level,
+    until one remains. Both stages are cached by content hash, so an edited document
+    only recomputes the changed chunks and the reduce groups above them.
+    """
+
+    def __init__(self, llm, model_name: str):
+        self.llm = llm
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.prompt_chars = 0
+
+    def _cached_invoke(self, stage: str, template: str, text: str) -> str:
+        key = (self.model_name, stage, content_hash(text))
+        cached = SUMMARY_CACHE.get(key)
+        if cached is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return cached
+
+        chain = ChatPromptTemplate.from_template(template) | self.llm
+        summary = chain.invoke({"text": text}).content
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_chars += len(template) + len(text)
+        SUMMARY_CACHE.set(key, summary)
+        return summary
+
+    def _map(self, texts: list[str]) -> list[str]:
+        return list(_SUMMARY_EXECUTOR.map(
+            lambda text: self._cached_invoke("map", MAP_TEMPLATE, text), texts
+        ))
+
+    def _reduce(self, summaries: list[str]) -> tuple[str, int]:
+        fanin = Config.SUMMARY_REDUCE_FANIN
+        levels = 0
+        while len(summaries) > 1:
+            groups = [
+                "\n\n".join(summaries[i:i + fanin])
+                for i in range(0, len(summaries), fanin)
+            ]
+            summaries = list(_SUMMARY_EXECUTOR.map(
+                lambda text: self._cached_invoke("reduce", REDUCE_TEMPLATE, text), groups
+            ))
+            levels += 1
+        return summaries[0], levels
+
+    def summarize(self, docs) -> dict:
+        """Summarizes the documents (assumed in reading order)."""
+        texts = [doc.page_content for doc in docs if doc.page_content.strip()]
+        if not texts:
+            return None
+
+        # 1. Map
+        summaries = self._map(texts)
+
+        # 2. Reduce
+        summary, levels = self._reduce(summaries)
+
+        return {
+            "summary": summary,
+            "chunks": len(texts),
+            "reduce_levels": levels,
+            "llm_calls": self.llm_calls,
+            "cache_hits": self.cache_hits,
+            "prompt_chars": self.prompt_chars,
+        }
@@ -1,36 +1,154 @@
 import io
+import hashlib
+from functools import lru_cache
+import numpy as np
 import pypdf
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from config import Config
+from extraction_cache import ExtractionCache
 
-def get_pdf_text(uploaded_file):
+@lru_cache(maxsize=1)
+def get_extraction_cache() -> ExtractionCache:
+    """Process-wide extraction cache, created on first use."""
+    return ExtractionCache()
+
+def extract_pdf_pages(data: bytes) -> list[str]:
     """
-    Extracts text from a Streamlit UploadedFile object (PDF).
+    Parses PDF bytes into per-page text with pypdf (uncached).
     """
     try:
-        pdf_reader = pypdf.PdfReader(uploaded_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
-        return text
+        pdf_reader = pypdf.PdfReader(io.BytesIO(data))
+        return [page.extract_text() or "" for page in pdf_reader.pages]
     except Exception as e:
         raise ValueError(f"Error reading PDF: {e}")
 
-def process_text_into_chunks(text: str, source_name: str) -> list[Document]:
+def get_pdf_text(uploaded_file):
+    """
+    Extracts text from a Streamlit UploadedFile object (PDF).
+    Identical bytes are parsed once: pages are cached on disk by content hash.
+    """
+    data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+
+    if not Config.EXTRACT_CACHE_ENABLED:
+        return "".join(extract_pdf_pages(data))
+
+    cache = get_extraction_cache()
+    key = cache.key(data, parser_version=f"pypdf-{pypdf.__version__}")
+    pages = cache.get(key)
+    if pages is None:
+        pages = extract_pdf_pages(data)
+        cache.set(key, pages)
+    return "".join(pages)
+
+def chunk_key(doc: Document) -> str:
+    """
+    Deterministic ID for a chunk, derived from its source and position.
+    Used wherever chunks need to be compared or deduplicated across stages.
+    """
+    raw = f"{doc.metadata.get('source', '')}:{doc.metadata.get('chunk_id', '')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+@lru_cache(maxsize=4)
+def get_encoding(name: str = None):
+    """tiktoken encoding, loaded once per process."""
+    import tiktoken
+    return tiktoken.get_encoding(name or Config.TOKENIZER_ENCODING)
+
+@lru_cache(maxsize=4)
+def _token_byte_lengths(encoding) -> np.ndarray:
+    """Byte length of every token ID in the vocabulary (0 for unused IDs), built once per encoding."""
+    lengths = np.zeros(encoding.n_vocab, dtype=np.int64)
+    for token in range(encoding.n_vocab):
+        try:
+            lengths[token] = len(encoding.decode_single_token_bytes(token))
+        except KeyError:
+            pass
+    return lengths
+
+def token_offsets(encoding, tokens: list[int]) -> tuple[str, list[int]]:
+    """
+    Decoded text and the character offset where each token starts, like
+    encoding.decode_with_offsets() but vectorized over a cached per-token length table.
+    """
+    data = encoding.decode_bytes(tokens)
+    try:
+        decoded = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return encoding.decode_with_offsets(tokens)
+
+    byte_lengths = _token_byte_lengths(encoding)[np.asarray(tokens, dtype=np.int64)]
+    byte_starts = np.cumsum(byte_lengths) - byte_lengths
+    raw = np.frombuffer(data, dtype=np.uint8)
+    # Character index of every byte: count the bytes that start a UTF-8 sequence
+    char_of_byte = np.cumsum((raw & 0xC0) != 0x80) - 1
+    return decoded, char_of_byte[byte_starts].tolist()
+
+def split_text_by_tokens(text: str, chunk_tokens: int = None, overlap: int = None) -> list[tuple[str, int]]:
+    """
+    Splits text into chunks of at most chunk_tokens tokens with `overlap` shared tokens.
+    The text is tokenized once; chunks are cut on the token character offsets, and each
+    cut is moved back to the last paragraph, line or sentence break in the final
+    CHUNK_BOUNDARY_LOOKBACK of the window when there is one. Returns (chunk, tokens) pairs.
     """
-    Splits text into chunks of 1000 characters with 100 overlap.
+    chunk_tokens = chunk_tokens or Config.CHUNK_TOKENS
+    overlap = Config.CHUNK_TOKEN_OVERLAP if overlap is None else overlap
+    encoding = get_encoding()
+
+    tokens = encoding.encode_ordinary(text)
+    if not tokens:
+        return []
+    decoded, offsets = token_offsets(encoding, tokens)
+    offsets.append(len(decoded))
+    lookback = int(chunk_tokens * Config.CHUNK_BOUNDARY_LOOKBACK)
+
+    chunks = []
+    start = 0
+    while start < len(tokens):
+        end = min(start + chunk_tokens, len(tokens))
+        if end < len(tokens):
+            # Prefer to end on a break: "\n\n" over "\n" over ". "
+            best, best_rank = end, 0
+            for j in range(end, max(end - lookback, start + overlap + 1), -1):
+                before = decoded[max(offsets[j] - 2, 0):offsets[j]]
+                rank = 3 if before.endswith("\n\n") else 2 if before.endswith("\n") else \
+                    1 if before.endswith((". ", "? ", "! ")) else 0
+                if rank > best_rank:
+                    best, best_rank = j, rank
+                    if rank == 3:
+                        break
+            end = best
+
+        chunk = decoded[offsets[start]:offsets[end]].strip()
+        if chunk:
+            chunks.append((chunk, end - start))
+        if end >= len(tokens):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+def process_text_into_chunks(text: str, source_name: str, mode: str = None) -> list[Document]:
+    """
+    Splits text into chunks of 1000 characters with 100 overlap, or with
+    CHUNKING="tokens" into chunks of CHUNK_TOKENS tokens (see split_text_by_tokens).
     """
     if not text:
         return []
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100,
-        length_function=len,
-        is_separator_regex=False,
-    )
-    
-    chunks = text_splitter.split_text(text)
+    if (mode or Config.CHUNKING) == "tokens":
+        pieces = split_text_by_tokens(text)
+        chunks = [chunk for chunk, _ in pieces]
+        token_counts = [count for _, count in pieces]
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=100,
+            length_function=len,
+            is_separator_regex=False,
+        )
+        
+        chunks = text_splitter.split_text(text)
+        token_counts = None
     
     documents = [
         Document(
@@ -42,5 +160,8 @@ def process_text_into_chunks(text: str, source_name: str) -> list[Document]:
             }
         ) for i, chunk in enumerate(chunks)
     ]
+    if token_counts:
+        for doc, count in zip(documents, token_counts):
+            doc.metadata["tokens"] = count
     
     return documents
\ No newline at end of file
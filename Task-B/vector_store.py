@@ -1,36 +1,229 @@
+import os
 import time
+import hashlib
 from pinecone import Pinecone, ServerlessSpec, PineconeException
 from langchain_pinecone import PineconeVectorStore
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
 from config import Config
+from singleflight import SingleFlight
+from local_store import LocalVectorStore
+from docstore import SQLiteDocstore
+from utils import chunk_key
+from cassette import get_cassette, CassetteEmbeddings, CassetteVectorStore
+
+# Shared across sessions so concurrent ingestions of the same text embed it once
+_EMBED_FLIGHT = SingleFlight()
+
+
+class CoalescingEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so that identical texts being embedded
+    concurrently (e.g. two users uploading the same document) are sent
+    to the provider only once. Texts already in flight are awaited instead.
+    """
+
+    def __init__(self, inner: Embeddings, flight: SingleFlight = _EMBED_FLIGHT):
+        self.inner = inner
+        self.flight = flight
+
+    @staticmethod
+    def _key(kind: str, text: str):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return (Config.EMBEDDING_MODEL, kind, digest)
+
+    def embed_query(self, text: str) -> list[float]:
+        vector, _ = self.flight.do(self._key("query", text), self.inner.embed_query, text)
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed_batch("document", texts, self.inner.embed_documents)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embeds several queries in one batched call; vectors match embed_query()."""
+        return self._embed_batch("query", texts, self._embed_queries_inner)
+
+    def _embed_queries_inner(self, texts: list[str]) -> list[list[float]]:
+        if hasattr(self.inner, "embed_queries"):
+            return self.inner.embed_queries(texts)
+        return self.inner.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+
+    def _embed_batch(self, kind: str, texts: list[str], embed_fn) -> list[list[float]]:
+        # 1. Claim every distinct text; remember which ones another caller owns
+        keys = [self._key(kind, text) for text in texts]
+        futures = {}
+        owned = []
+        for key, text in zip(keys, texts):
+            if key in futures:
+                continue
+            future, is_leader = self.flight.claim(key)
+            futures[key] = future
+            if is_leader:
+                owned.append((key, text))
+
+        # 2. Embed our share in a single batched call and publish the results
+        if owned:
+            resolved = 0
+            error = None
+            try:
+                vectors = embed_fn([text for _, text in owned])
+                if len(vectors) != len(owned):
+                    raise ValueError(f"Embedding provider returned {len(vectors)} vectors for {len(owned)} texts")
+                for (key, _), vector in zip(owned, vectors):
+                    self.flight.resolve(key, vector)
+                    resolved += 1
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Release every key we still hold, or its waiters would block forever
+                for key, _ in owned[resolved:]:
+                    self.flight.fail(key, error)
+
+        # 3. Collect everything in input order, waiting on foreign keys
+        return [futures[key].result() for key in keys]
+
+
+class CompactPineconeVectorStore(VectorStore):
+    """
+    Pinecone store that keeps only IDs and a few filter fields with each vector
+    (Config.VECTOR_METADATA_FIELDS); chunk text and full metadata live in a local
+    docstore. Similarity results are returned as ID/score stubs with empty text,
+    to be filled with docstore.hydrate_documents() only for the chunks a stage uses.
+    """
+
+    def __init__(self, index, embedding, docstore: SQLiteDocstore, namespace: str = None):
+        self.index = index
+        self._embedding = embedding
+        self.docstore = docstore
+        self.namespace = namespace or Config.NAMESPACE
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @staticmethod
+    def _compact_metadata(metadata: dict) -> dict:
+        return {k: metadata[k] for k in Config.VECTOR_METADATA_FIELDS if k in metadata}
+
+    def add_documents(self, documents, ids=None, **kwargs) -> list[str]:
+        documents = list(documents)
+        ids = ids or [chunk_key(doc) for doc in documents]
+        vectors = self._embedding.embed_documents([doc.page_content for doc in documents])
+
+        # Texts first: a vector must never be searchable without its text
+        self.docstore.put_many(ids, documents)
+        for start in range(0, len(ids), Config.UPSERT_BATCH_SIZE):
+            end = start + Config.UPSERT_BATCH_SIZE
+            self.index.upsert(
+                vectors=[
+                    {"id": doc_id, "values": vector, "metadata": self._compact_metadata(doc.metadata)}
+                    for doc_id, vector, doc in zip(ids[start:end], vectors[start:end], documents[start:end])
+                ],
+                namespace=self.namespace
+            )
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs) -> list[str]:
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        return self.add_documents(documents, ids=ids)
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        self.index.delete(ids=list(ids), namespace=self.namespace)
+        self.docstore.delete_many(list(ids))
+        return True
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        response = self.index.query(
+            vector=embedding,
+            top_k=k,
+            include_metadata=True,
+            namespace=self.namespace,
+            filter=filter
+        )
+        return [
+            (Document(page_content="", metadata=dict(match.metadata or {}), id=match.id), match.score)
+            for match in response.matches
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        """Unlike the *_with_score methods, returns fully hydrated documents."""
+        docs = [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+        found = self.docstore.get_many([doc.id for doc in docs])
+        return [found[doc.id] for doc in docs if doc.id in found]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Use initialize_vectorstore() with COMPACT_METADATA enabled")
+
 
 def get_embeddings():
     """Returns the Google Generative AI Embeddings model."""
-    return GoogleGenerativeAIEmbeddings(model=Config.EMBEDDING_MODEL)
+    cassette = get_cassette()
+    if cassette is None:
+        return CoalescingEmbeddings(GoogleGenerativeAIEmbeddings(model=Config.EMBEDDING_MODEL))
+
+    inner = None if cassette.replaying else GoogleGenerativeAIEmbeddings(model=Config.EMBEDDING_MODEL)
+    return CoalescingEmbeddings(CassetteEmbeddings(inner, cassette))
 
 def initialize_vectorstore():
     """
     Initializes and returns the Pinecone VectorStore.
     Creates the index if it doesn't exist.
+    With VECTOR_BACKEND="local", returns an in-process LocalVectorStore instead.
+    With a cassette active, the store is wrapped for record/replay; replay needs no backend.
     """
-    try:
-        pc = Pinecone(api_key=Config.PINECONE_API_KEY) 
-        
-        existing_indexes = [i.name for i in pc.list_indexes()]
-        
-        if Config.INDEX_NAME not in existing_indexes:
-            pc.create_index(
-                name=Config.INDEX_NAME,
-                dimension=Config.EMBEDDING_DIMENSION,
-                metric="cosine",
-                spec=ServerlessSpec(cloud=Config.CLOUD_PROVIDER, region=Config.REGION)
-            )
-            time.sleep(1)
+    cassette = get_cassette()
+    if cassette is None:
+        return _initialize_backend()
+    if cassette.replaying:
+        docstore = SQLiteDocstore() if Config.COMPACT_METADATA else None
+        return CassetteVectorStore(None, cassette, docstore, embeddings=get_embeddings())
+    return CassetteVectorStore(_initialize_backend(), cassette)
+
+def get_pinecone_index():
+    """Connects to Pinecone and returns the index, creating it if it doesn't exist."""
+    pc = Pinecone(api_key=Config.PINECONE_API_KEY) 
+    
+    existing_indexes = [i.name for i in pc.list_indexes()]
+    
+    if Config.INDEX_NAME not in existing_indexes:
+        pc.create_index(
+            name=Config.INDEX_NAME,
+            dimension=Config.EMBEDDING_DIMENSION,
+            metric="cosine",
+            spec=ServerlessSpec(cloud=Config.CLOUD_PROVIDER, region=Config.REGION)
+        )
+        time.sleep(1)
+
+    return pc.Index(Config.INDEX_NAME)
+
+def _initialize_backend():
+    """Connects to the configured vector backend."""
+    if Config.VECTOR_BACKEND == "local":
+        path = Config.LOCAL_INDEX_PATH
+        if path and os.path.exists(path):
+            return LocalVectorStore.load(path, get_embeddings())
+        return LocalVectorStore(get_embeddings(), path=path or None)
 
+    try:
+        index = get_pinecone_index()
         embeddings = get_embeddings()
+
+        if Config.COMPACT_METADATA:
+            return CompactPineconeVectorStore(index, embeddings, SQLiteDocstore())
         
         vectorstore = PineconeVectorStore(
-            index_name=Config.INDEX_NAME,
+            index=index,
             embedding=embeddings,
             namespace=Config.NAMESPACE
         )
@@ -0,0 +1,118 @@
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+
+class Saturated(RuntimeError):
+    """Raised when the work queue is full; `retry_after` is the estimated wait in seconds."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = round(retry_after, 1)
+        super().__init__(f"Server is busy, try again in ~{self.retry_after}s")
+
+
+class WorkExecutor:
+    """
+    Process-wide bounded pool for query and ingestion work, so Streamlit script
+    threads only wait on futures instead of each running a pipeline themselves.
+    Admission control: once WORK_MAX_QUEUE tasks are waiting, new work is either
+    rejected straight away ("reject") or held for up to WORK_MAX_WAIT_SECONDS for a
+    queue slot ("wait"), then rejected. Tracks queue depth and an EWMA of service
+    time per kind of work, which also drives the wait-time estimates.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None, admission: str = None, alpha: float = 0.2):
+        self.workers = workers or Config.WORK_WORKERS
+        self.max_queue = max_queue or Config.WORK_MAX_QUEUE
+        self.admission = admission or Config.WORK_ADMISSION
+        self.alpha = alpha
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rag-work")
+        self._cond = threading.Condition()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queue_seen = 0
+        self.service_ewma: dict = {}
+        self.wait_ewma = 0.0
+
+    def _service_time(self, kind: str) -> float:
+        if kind in self.service_ewma:
+            return self.service_ewma[kind]
+        return max(self.service_ewma.values(), default=1.0)
+
+    def _estimate(self, kind: str) -> float:
+        # Called with the lock held
+        if self.running + self.queued < self.workers:
+            return 0.0
+        rounds = math.ceil((self.queued + 1) / self.workers)
+        return rounds * self._service_time(kind)
+
+    def wait_estimate(self, kind: str = "query") -> float:
+        """Seconds a task submitted now would wait before a worker picks it up."""
+        with self._cond:
+            return round(self._estimate(kind), 1)
+
+    def submit(self, kind: str, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs). Raises Saturated if no queue slot can be had."""
+        with self._cond:
+            if self.queued >= self.max_queue:
+                if self.admission == "reject":
+                    self.rejected += 1
+                    raise Saturated(self._estimate(kind))
+                deadline = time.monotonic() + Config.WORK_MAX_WAIT_SECONDS
+                while self.queued >= self.max_queue:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise Saturated(self._estimate(kind))
+                    self._cond.wait(remaining)
+
+            self.queued += 1
+            self.max_queue_seen = max(self.max_queue_seen, self.queued)
+        return self._pool.submit(self._run, kind, time.monotonic(), fn, args, kwargs)
+
+    def _run(self, kind: str, enqueued_at: float, fn, args, kwargs):
+        started_at = time.monotonic()
+        with self._cond:
+            self.queued -= 1
+            self.running += 1
+            self.wait_ewma = self.alpha * (started_at - enqueued_at) + (1 - self.alpha) * self.wait_ewma
+            self._cond.notify()
+
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            elapsed = time.monotonic() - started_at
+            with self._cond:
+                self.running -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                previous = self.service_ewma.get(kind)
+                self.service_ewma[kind] = elapsed if previous is None else \
+                    self.alpha * elapsed + (1 - self.alpha) * previous
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_queue_seen": self.max_queue_seen,
+                "wait_ewma": round(self.wait_ewma, 3),
+                "service_ewma": {kind: round(t, 3) for kind, t in self.service_ewma.items()},
+            }
+
+
+WORK_EXECUTOR = WorkExecutor()